@@ -0,0 +1,304 @@
+"""
+Définition des trois assistants OpenAI et registre qui évite de les recréer
+à chaque rerun Streamlit.
+
+Les identifiants sont persistés dans la table `assistants` de `leads.db`,
+indexés par un hash (instructions, modèle, outils) : un assistant n'est
+recréé que lorsque son prompt change réellement.
+"""
+import hashlib
+import json
+import sys
+
+from db import DB_PATH, connect
+
+ASSISTANT_MODEL = "gpt-4o"
+# Tag posé dans les métadonnées des assistants créés par l'application,
+# utilisé pour retrouver les assistants orphelins.
+APP_METADATA_TAG = "cartevisiteocr"
+
+##############################
+# Définition des assistants  #
+##############################
+# Assistant 1 : Extraction & recherche
+assistant_prompt_instruction = """
+Vous êtes Chat IA, expert en analyse de cartes de visite.
+Votre tâche est d'extraire les informations suivantes du texte OCR fourni :
+    - Nom
+    - Prénom
+    - Téléphone
+    - Mail
+Et de compléter ces informations par une recherche en ligne.
+Répondez sous forme de texte structuré, par exemple :
+Nom: Doe
+Prénom: John
+Téléphone: 0123456789
+Mail: john.doe@example.com
+Entreprise: Example Corp
+"""
+
+# Assistant 2 : Description des produits
+product_assistant_instruction = """
+Tu es un responsable commerciale.
+Ta tâche est de réaliser en fonction des informations sur le client ainsi que des notes de l’utilisateur un matching entre nos produits et les besoins du client.
+
+Voici la présentation de ce que Nin-IA propose : 
+
+**Propulsez Votre Expertise en IA avec NIN-IA : Formations, Modules et Audits, la Triade du Succès !**
+
+L'Intelligence Artificielle est la clé du futur, et NIN-IA vous offre la boîte à outils complète pour la maîtriser. Nos **formations de pointe** sont au cœur de notre offre, vous dotant des compétences essentielles. Pour une flexibilité maximale et des besoins spécifiques, découvrez nos **modules IA à la carte**. Et pour assurer le succès de vos projets, nos **audits IA experts** sont votre filet de sécurité.
+
+**Notre priorité : Votre montée en compétences grâce à nos formations !**
+
+- **Formations de Pointe : Devenez un Expert en IA Générative** : Nos formations vous plongent au cœur des algorithmes et des outils d'IA les plus performants. Adaptées à tous les niveaux, elles vous permettent de créer du contenu innovant, d'optimiser vos processus et de surpasser vos concurrents. **Ne vous contentez pas de suivre la vague, surfez sur elle !**
+- **Modules IA : Apprentissage Personnalisé, Impact Immédiat** : Pour compléter votre formation ou répondre à des besoins précis, explorez nos modules IA à la carte. Concentrés sur des compétences spécifiques, ils vous offrent un apprentissage ciblé et une mise en œuvre rapide. **La flexibilité au service de votre expertise !**
+- **Audits IA : Sécurisez Votre Investissement, Maximisez Votre ROI** : Avant d'investir massivement dans l'IA, assurez-vous que votre stratégie est solide. Nos audits IA identifient les points faibles de votre projet, optimisent vos ressources et évitent les erreurs coûteuses. **L'assurance d'un succès durable !**
+
+**Détails de Notre Offre :**
+
+- **Formations Structurées :**
+    - **IA Générative 101 : Les Fondamentaux (Débutant) :** Apprenez les bases et explorez les premières applications concrètes.
+    - **Création de Contenu Révolutionnaire avec ChatGPT (Intermédiaire) :** Maîtrisez ChatGPT pour générer des textes percutants.
+    - **Deep Learning pour l'IA Générative : Devenez un Expert (Avancé) :** Plongez au cœur des réseaux neuronaux et débloquez le plein potentiel de l'IA.
+    - **IA Générative pour le Marketing Digital (Spécial Marketing) :** Multipliez vos leads et convertissez vos prospects grâce à l'IA.
+    - **Intégration de l'IA Générative dans Votre Entreprise (Spécial Entreprise) :** Intégrez l'IA dans vos processus et créez de nouvelles opportunités.
+- **Modules IA à la Carte (Nouveauté !) :**
+    - **[Exemple] : "Module : Optimisation des Prompts pour ChatGPT" :** Maîtrisez l'art de formuler des requêtes efficaces pour obtenir des résultats exceptionnels avec ChatGPT. **Transformez vos instructions en or !**
+    - **[Exemple] : "Module : Analyse de Sentiments avec l'IA" :** Comprenez les émotions de vos clients et adaptez votre communication en conséquence. **Transformez les données en insights précieux !**
+    - **[Exemple] : "Module : Génération d'Images avec Stable Diffusion" :** Créez des visuels époustouflants en quelques clics grâce à la puissance de l'IA. **Donnez vie à vos idées les plus folles !**
+- **Audits IA Experts :**
+    - Analyse approfondie de votre projet IA.
+    - Identification des risques et des opportunités.
+    - Recommandations personnalisées pour optimiser votre ROI.
+    - Garantie de conformité réglementaire.
+
+**Pourquoi choisir NIN-IA ?**
+
+- **Expertise Reconnue :** Des formateurs passionnés et des experts en IA à votre service.
+- **Approche Pédagogique Innovante :** Apprentissage pratique et mises en situation réelles.
+- **Offre Complète :** Formations, modules et audits pour répondre à tous vos besoins.
+- **Accompagnement Personnalisé :** Nous sommes à vos côtés à chaque étape de votre parcours.
+"""
+
+# Assistant 3 : Rédaction du mail
+email_assistant_instruction = """
+Tu es un expert en rédaction de mails de relance et assistant d’Emeline de Nin-IA.
+Vos mails commencent toujours par "Bonjour [prénom]" et se terminent par "Cordialement Emeline Boulange, Co-dirigeante de Nin-IA.
+
+TA tâche est de rédiger un mail de relance percutant pour convertir le lead, en tenant compte :
+
+- des informations extraites (Assistant 1),
+- du matching de notre offre (Assistant 2),
+- de la qualification et des notes du lead.
+Veillez à intégrer les notes de l'utilisateur pour instaurer une relation de proximité.
+Et surtout bien mettre en place le contexte de la rencontre si cela est précisé 
+Répondez sous forme d'un texte structuré (salutation, introduction, corps, conclusion).
+"""
+
+TAVILY_SEARCH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "tavily_search",
+        "description": "Recherche en ligne pour obtenir des informations sur une personne ou une entreprise.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Par exemple : 'John Doe, PDG de Example Corp'."}
+            },
+            "required": ["query"]
+        }
+    }
+}
+
+# Assistant 1, mode sortie structurée : mêmes champs, renvoyés en JSON
+structured_assistant_prompt_instruction = """
+Vous êtes Chat IA, expert en analyse de cartes de visite.
+Votre tâche est d'extraire du texte OCR fourni le nom, le prénom, le téléphone,
+le mail et l'entreprise de la personne, et de compléter ces informations par
+une recherche en ligne.
+Répondez uniquement avec un objet JSON conforme au schéma imposé. Le champ
+"resume" présente en 3 à 5 phrases la personne, son rôle et les activités de
+son entreprise : c'est la seule information transmise aux autres assistants.
+Laissez un champ vide ("") si l'information est introuvable.
+"""
+
+AGENT1_FIELDS = ("nom", "prenom", "telephone", "mail", "entreprise", "resume")
+
+AGENT1_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "carte_de_visite",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in AGENT1_FIELDS},
+            "required": list(AGENT1_FIELDS),
+            "additionalProperties": False,
+        },
+    },
+}
+
+ASSISTANT_SPECS = {
+    "extraction_structured": {
+        "instructions": structured_assistant_prompt_instruction,
+        "model": ASSISTANT_MODEL,
+        "tools": [TAVILY_SEARCH_TOOL],
+        "response_format": AGENT1_RESPONSE_FORMAT,
+    },
+    "extraction": {
+        "instructions": assistant_prompt_instruction,
+        "model": ASSISTANT_MODEL,
+        "tools": [TAVILY_SEARCH_TOOL],
+    },
+    "product": {
+        "instructions": product_assistant_instruction,
+        "model": ASSISTANT_MODEL,
+        "tools": [],
+    },
+    "email": {
+        "instructions": email_assistant_instruction,
+        "model": ASSISTANT_MODEL,
+        "tools": [],
+    },
+}
+
+##############################
+# Registre des assistants    #
+##############################
+def assistant_config_hash(instructions, model, tools, response_format=None):
+    """Hash stable de la configuration d'un assistant (instructions, modèle, outils, format de réponse)."""
+    config = {"instructions": instructions, "model": model, "tools": tools or []}
+    if response_format:
+        config["response_format"] = response_format
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_untagged_app_assistant(assistant, specs=None):
+    """
+    Assistant sans tag APP_METADATA_TAG créé par l'application avant le
+    registre : sans nom (ou nommé comme une spécification), avec le modèle et
+    les instructions d'une des spécifications.
+    """
+    specs = specs or ASSISTANT_SPECS
+    metadata = getattr(assistant, "metadata", None) or {}
+    if metadata.get("app"):
+        return False
+    name = getattr(assistant, "name", None)
+    if name and name not in specs:
+        return False
+    instructions = (getattr(assistant, "instructions", None) or "").strip()
+    return any(
+        instructions == spec["instructions"].strip() and getattr(assistant, "model", None) == spec["model"]
+        for spec in specs.values()
+    )
+
+
+class AssistantRegistry:
+    """Crée les assistants au plus une fois et mémorise leurs identifiants dans SQLite."""
+
+    def __init__(self, client, db_path=DB_PATH):
+        self.client = client
+        self.conn = connect(db_path, check_same_thread=False)
+
+    def _lookup(self, name, config_hash):
+        row = self.conn.execute(
+            "SELECT assistant_id FROM assistants WHERE name = ? AND config_hash = ?",
+            (name, config_hash)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _exists_remotely(self, assistant_id):
+        """Vérifie que l'assistant existe toujours côté OpenAI (supprimé à la main, autre compte...)."""
+        try:
+            self.client.beta.assistants.retrieve(assistant_id)
+            return True
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404:
+                return False
+            raise
+
+    def get_or_create(self, name, instructions, model, tools=None, response_format=None):
+        """Retourne l'identifiant de l'assistant, en le créant seulement si sa configuration est inconnue."""
+        config_hash = assistant_config_hash(instructions, model, tools, response_format)
+        assistant_id = self._lookup(name, config_hash)
+        if assistant_id and self._exists_remotely(assistant_id):
+            return assistant_id
+        kwargs = {
+            "name": name,
+            "instructions": instructions,
+            "model": model,
+            "metadata": {"app": APP_METADATA_TAG, "config_hash": config_hash},
+        }
+        if tools:
+            kwargs["tools"] = tools
+        if response_format:
+            kwargs["response_format"] = response_format
+        assistant = self.client.beta.assistants.create(**kwargs)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO assistants (name, config_hash, assistant_id) VALUES (?, ?, ?)",
+            (name, config_hash, assistant.id)
+        )
+        return assistant.id
+
+    def ensure_all(self, specs=None):
+        """Retourne un dictionnaire {nom: assistant_id} pour toutes les spécifications."""
+        specs = specs or ASSISTANT_SPECS
+        return {
+            name: self.get_or_create(
+                name, spec["instructions"], spec["model"], spec.get("tools"), spec.get("response_format")
+            )
+            for name, spec in specs.items()
+        }
+
+    def cleanup_orphans(self, specs=None, include_untagged=False):
+        """
+        Supprime les assistants créés par l'application qui ne correspondent plus
+        à une configuration courante (prompt modifié, anciens reruns...).
+        Avec `include_untagged`, supprime aussi les assistants sans tag créés par
+        les versions précédentes à chaque rerun (voir `is_untagged_app_assistant`).
+        Retourne la liste des identifiants supprimés.
+        """
+        specs = specs or ASSISTANT_SPECS
+        current_ids = set()
+        for name, spec in specs.items():
+            config_hash = assistant_config_hash(
+                spec["instructions"], spec["model"], spec.get("tools"), spec.get("response_format")
+            )
+            assistant_id = self._lookup(name, config_hash)
+            if assistant_id:
+                current_ids.add(assistant_id)
+
+        deleted = []
+        for assistant in self.client.beta.assistants.list(limit=100):
+            metadata = getattr(assistant, "metadata", None) or {}
+            if assistant.id in current_ids:
+                continue
+            if metadata.get("app") != APP_METADATA_TAG and not (
+                include_untagged and is_untagged_app_assistant(assistant, specs)
+            ):
+                continue
+            self.client.beta.assistants.delete(assistant.id)
+            deleted.append(assistant.id)
+
+        placeholders = ",".join("?" for _ in current_ids)
+        self.conn.execute(
+            f"DELETE FROM assistants WHERE assistant_id NOT IN ({placeholders})",
+            tuple(current_ids)
+        )
+        return deleted
+
+
+if __name__ == "__main__":
+    # python assistants.py [--cleanup [--include-untagged]]
+    import os
+    from openai import OpenAI
+    from migrations import migrate_database
+
+    migrate_database()
+    registry = AssistantRegistry(OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+    for name, assistant_id in registry.ensure_all().items():
+        print(f"{name}: {assistant_id}")
+    if "--cleanup" in sys.argv[1:]:
+        for assistant_id in registry.cleanup_orphans(include_untagged="--include-untagged" in sys.argv[1:]):
+            print(f"Supprimé : {assistant_id}")
@@ -0,0 +1,209 @@
+"""
+Traitement par lot d'une pile de cartes de visite.
+
+Les cartes sont réparties sur un pool de threads ; chaque fournisseur externe
+(Mistral, OpenAI, Tavily) a sa propre limite de concurrence et les réponses
+429 sont rejouées avec un backoff exponentiel à jitter. L'échec d'une carte
+n'interrompt pas le lot.
+
+    python batch.py dossier_cartes/ --note "Salon VivaTech" --workers 8
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+
+from db import DB_PATH, connect, insert_leads
+from pipeline import process_card
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_LIMITS = {"mistral": 4, "openai": 6, "tavily": 4}
+DEFAULT_FLUSH_EVERY = 5
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def is_rate_limited(error):
+    """Vrai si l'erreur correspond à un HTTP 429 (quel que soit le SDK)."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+class ProviderGate:
+    """
+    Encadre les appels externes : un sémaphore par fournisseur et des retries
+    avec « full jitter » sur les 429.
+    """
+
+    def __init__(self, limits=None, max_attempts=5, base_delay=1.0, max_delay=30.0):
+        limits = {**DEFAULT_PROVIDER_LIMITS, **(limits or {})}
+        self.semaphores = {name: threading.BoundedSemaphore(n) for name, n in limits.items()}
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, provider, fn, *args, **kwargs):
+        semaphore = self.semaphores.get(provider)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if semaphore is None:
+                    return fn(*args, **kwargs)
+                with semaphore:
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_attempts:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                logger.warning("%s : 429, nouvel essai %d dans %.1fs", provider, attempt + 1, delay)
+                time.sleep(delay)
+
+
+@dataclass
+class BatchResult:
+    """Issue du traitement d'une carte du lot."""
+    name: str
+    lead_id: int = None
+    lead: dict = None
+    error: str = None
+    duration: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def run_batch(clients, cards, qualification, note, conn, workers=4, on_progress=None,
+              flush_every=DEFAULT_FLUSH_EVERY):
+    """
+    Traite `cards` (liste de (nom, image_bytes)) en parallèle. Les leads prêts
+    sont enregistrés depuis le thread appelant, par paquets de `flush_every`
+    dans une seule transaction (et en fin de lot). `on_progress(done, total,
+    result)` est appelé depuis le thread appelant : immédiatement pour une
+    carte en échec, après l'enregistrement de son paquet pour une carte réussie.
+    """
+    if clients.gate is None:
+        clients = replace(clients, gate=ProviderGate())
+
+    def process(name, image_bytes):
+        start = time.perf_counter()
+        try:
+            lead = process_card(clients, image_bytes, qualification, note)
+            return BatchResult(name, lead=lead, duration=time.perf_counter() - start)
+        except Exception as e:
+            logger.exception("Carte %s en échec", name)
+            return BatchResult(name, error=str(e), duration=time.perf_counter() - start)
+
+    results, pending = [], []
+
+    def report(result):
+        results.append(result)
+        if on_progress:
+            on_progress(len(results), len(cards), result)
+
+    def flush():
+        try:
+            lead_ids = insert_leads(conn, [result.lead for result in pending])
+        except Exception as e:
+            logger.exception("Enregistrement de %d leads en échec", len(pending))
+            for result in pending:
+                result.error = f"Enregistrement : {e}"
+        else:
+            for result, lead_id in zip(pending, lead_ids):
+                result.lead_id = lead_id
+        for result in pending:
+            report(result)
+        pending.clear()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process, name, image_bytes) for name, image_bytes in cards]
+        for future in as_completed(futures):
+            result = future.result()
+            if not result.ok:
+                report(result)
+                continue
+            pending.append(result)
+            if len(pending) >= flush_every:
+                flush()
+    if pending:
+        flush()
+    return results
+
+
+def load_cards(directory):
+    """Charge les images d'un dossier sous forme de (nom, bytes)."""
+    cards = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(directory, name), "rb") as f:
+                cards.append((name, f.read()))
+    return cards
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Traitement par lot de cartes de visite.")
+    parser.add_argument("directory", help="Dossier contenant les photos de cartes")
+    parser.add_argument("--qualification", default="Smart Talk")
+    parser.add_argument("--note", required=True)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--backend", choices=["threads", "chat"], default=None,
+                        help="Exécution des assistants (par défaut : variable AGENT_BACKEND ou 'threads')")
+    parser.add_argument("--reuse", action="store_true",
+                        help="Réutiliser l'enrichissement des contacts déjà présents en base")
+    for provider, limit in DEFAULT_PROVIDER_LIMITS.items():
+        parser.add_argument(f"--{provider}-limit", type=int, default=limit)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from openai import OpenAI
+    from mistralai import Mistral
+    from tavily import TavilyClient
+    from assistants import AssistantRegistry
+    from migrations import migrate
+    from ocr_cache import OCRCache
+    from pipeline import Clients
+    from search_cache import SearchCache
+
+    conn = connect(args.db)
+    migrate(conn)
+    client_openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    clients = Clients(
+        openai=client_openai,
+        mistral=Mistral(api_key=os.getenv("MISTRAL_API_KEY")),
+        tavily=TavilyClient(api_key=os.getenv("TAVILY_API_KEY")),
+        assistant_ids={},
+        gate=ProviderGate({p: getattr(args, f"{p}_limit") for p in DEFAULT_PROVIDER_LIMITS}),
+        ocr_cache=OCRCache(db_path=args.db),
+        search_cache=SearchCache(db_path=args.db),
+        leads_db=args.db,
+        reuse_enrichment=args.reuse,
+    )
+    if args.backend:
+        clients.backend = args.backend
+    if clients.backend == "threads":
+        clients.assistant_ids = AssistantRegistry(client_openai, db_path=args.db).ensure_all()
+    cards = load_cards(args.directory)
+
+    def progress(done, total, result):
+        status = f"lead #{result.lead_id}" if result.ok else f"ÉCHEC : {result.error}"
+        if result.ok and result.lead.get("reused_from"):
+            status += f" (enrichissement du lead #{result.lead['reused_from']})"
+        print(f"[{done}/{total}] {result.name} ({result.duration:.1f}s) {status}", flush=True)
+
+    start = time.perf_counter()
+    results = run_batch(clients, cards, args.qualification, args.note, conn,
+                        workers=args.workers, on_progress=progress)
+    failed = [r for r in results if not r.ok]
+    print(f"{len(results) - len(failed)}/{len(results)} cartes traitées en {time.perf_counter() - start:.1f}s")
+    print(f"Cache OCR : {clients.ocr_cache.stats()}")
+    print(f"Cache Tavily : {clients.search_cache.stats()}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
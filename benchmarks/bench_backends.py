@@ -0,0 +1,54 @@
+"""
+Compare le temps par lead entre le backend « threads » (API Assistants) et
+le backend « chat » (Chat Completions en streaming), sur le client factice
+avec une latence réseau simulée par requête.
+
+    python benchmarks/bench_backends.py
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_clients import FakeOpenAI
+from pipeline import Clients, process_card
+
+ASSISTANT_IDS = {"extraction": "asst_1", "extraction_structured": "asst_1s", "product": "asst_2", "email": "asst_3"}
+
+
+def run(backend, request_latency, run_duration, tool_rounds):
+    openai = FakeOpenAI(run_duration=run_duration, tool_rounds=tool_rounds, request_latency=request_latency)
+    mistral = SimpleNamespace(ocr=SimpleNamespace(process=lambda **kwargs: SimpleNamespace(
+        pages=[SimpleNamespace(markdown="Jean Dupont\njean.dupont@example.com")]
+    )))
+    tavily = SimpleNamespace(get_search_context=lambda query, **kwargs: "contexte")
+    clients = Clients(openai=openai, mistral=mistral, tavily=tavily, assistant_ids=ASSISTANT_IDS,
+                      image_options=None, backend=backend)
+    marks = [time.perf_counter()]
+    stages = {}
+
+    def on_stage(stage, lead):
+        marks.append(time.perf_counter())
+        stages[stage] = marks[-1] - marks[-2]
+
+    process_card(clients, b"carte", "Smart Talk", "Note", on_stage=on_stage)
+    return marks[-1] - marks[0], stages, sum(openai.calls.values())
+
+
+def main():
+    run_duration, tool_rounds = 0.5, 1
+    print(f"génération simulée {run_duration}s par requête, {tool_rounds} tour d'outils par assistant\n")
+    print(f"{'RTT':>6} {'backend':<9}{'agent1':>8}{'agent2':>8}{'agent3':>8}{'total':>8}{'requêtes':>10}")
+    for request_latency in (0.02, 0.1, 0.25):
+        for backend in ("threads", "chat"):
+            elapsed, stages, requests = run(backend, request_latency, run_duration, tool_rounds)
+            print(f"{request_latency * 1000:>4.0f}ms {backend:<9}"
+                  + "".join(f"{stages[s]:>7.2f}s" for s in ("agent1", "agent2", "agent3"))
+                  + f"{elapsed:>7.2f}s{requests:>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
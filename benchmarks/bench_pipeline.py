@@ -0,0 +1,133 @@
+"""
+Banc d'essai hors ligne du pipeline complet (OCR, assistants 1 à 3, outils,
+enregistrement en base) sur des réponses enregistrées, avec des latences
+simulées configurables pour Mistral, Tavily et OpenAI.
+
+Deux charges : des cartes traitées une à une (mode « Carte unique ») puis un
+lot traité par `run_batch`. Pour chacune, le temps de bout en bout et les
+p50 / p95 par étape, lus dans les spans du lead (voir metrics.py).
+
+    python benchmarks/bench_pipeline.py [--backend threads|chat|both] [--cards 20] [--workers 4]
+                                        [--scale 0.1] [--recording benchmarks/recordings/sample.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import ProviderGate, run_batch
+from db import connect, insert_lead
+from fake_clients import fake_clients_from_recording, load_recording
+from migrations import migrate
+from pipeline import Clients, process_card
+from search_cache import SearchCache
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings", "sample.json")
+STAGES = ("pipeline", "ocr", "agent1", "agent1/tool", "agent2", "agent2/tool", "agent3", "agent3/tool",
+          "db_insert")
+
+
+def percentile(values, q):
+    """Percentile par rang le plus proche (q entre 0 et 1)."""
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q * len(values) + 0.5) - 1))]
+
+
+def make_clients(recording, args, backend, db_path):
+    scale = args.scale
+    openai, mistral, tavily = fake_clients_from_recording(
+        recording, ocr_latency=args.ocr_latency * scale, search_latency=args.search_latency * scale,
+        run_duration=args.run_duration * scale, request_latency=args.request_latency * scale,
+        tool_rounds=args.tool_rounds,
+    )
+    clients = Clients(
+        openai=openai, mistral=mistral, tavily=tavily,
+        assistant_ids={key: key for key in recording["replies"]},
+        image_options=None, backend=backend,
+        search_cache=SearchCache(db_path) if args.search_cache else None,
+        leads_db=db_path, reuse_enrichment=args.reuse,
+    )
+    return clients, openai
+
+
+def report(title, leads, elapsed, openai):
+    durations = defaultdict(list)
+    for lead in leads:
+        for span in lead["spans"]:
+            durations[span.stage].append(span.duration)
+    requests = sum(openai.calls.values())
+    print(f"\n{title} : {len(leads)} lead(s) en {elapsed:.2f}s ({len(leads) / elapsed * 60:.1f} leads/min), "
+          f"{requests} requêtes OpenAI")
+    print(f"  {'étape':<14}{'n':>5}{'p50':>10}{'p95':>10}{'total':>10}")
+    for stage in STAGES + tuple(sorted(set(durations) - set(STAGES))):
+        values = durations.get(stage)
+        if values:
+            print(f"  {stage:<14}{len(values):>5}{percentile(values, 0.5):>9.3f}s"
+                  f"{percentile(values, 0.95):>9.3f}s{sum(values):>9.2f}s")
+
+
+def bench_single(recording, args, backend, db_path):
+    """Cartes traitées l'une après l'autre, chacune enregistrée dès qu'elle est prête."""
+    clients, openai = make_clients(recording, args, backend, db_path)
+    conn = connect(db_path)
+    leads = []
+    start = time.perf_counter()
+    for i in range(args.single):
+        lead = process_card(clients, f"carte {i}".encode(), "Smart Talk", "Banc d'essai")
+        insert_lead(conn, lead)
+        leads.append(lead)
+    report(f"[{backend}] carte unique", leads, time.perf_counter() - start, openai)
+
+
+def bench_batch(recording, args, backend, db_path):
+    """Lot de `--cards` cartes traité par run_batch avec `--workers` threads."""
+    clients, openai = make_clients(recording, args, backend, db_path)
+    clients.gate = ProviderGate()
+    conn = connect(db_path)
+    cards = [(f"carte_{i}.jpg", f"lot {i}".encode()) for i in range(args.cards)]
+    start = time.perf_counter()
+    results = run_batch(clients, cards, "Smart Talk", "Banc d'essai", conn, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result.ok]
+    report(f"[{backend}] lot, {args.workers} workers", [r.lead for r in results if r.ok], elapsed, openai)
+    for result in failed:
+        print(f"  ÉCHEC {result.name} : {result.error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", default=DEFAULT_RECORDING)
+    parser.add_argument("--backend", choices=["threads", "chat", "both"], default="both")
+    parser.add_argument("--single", type=int, default=3, help="Cartes traitées une à une")
+    parser.add_argument("--cards", type=int, default=20, help="Cartes du lot")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ocr-latency", type=float, default=2.0, help="Secondes par appel OCR Mistral")
+    parser.add_argument("--search-latency", type=float, default=1.5, help="Secondes par recherche Tavily")
+    parser.add_argument("--run-duration", type=float, default=4.0, help="Secondes de génération par requête OpenAI")
+    parser.add_argument("--request-latency", type=float, default=0.15, help="Aller-retour HTTP OpenAI")
+    parser.add_argument("--tool-rounds", type=int, default=1, help="Tours d'outils par assistant")
+    parser.add_argument("--scale", type=float, default=0.1,
+                        help="Facteur appliqué à toutes les latences (1 = valeurs ci-dessus)")
+    parser.add_argument("--search-cache", action="store_true", help="Active le cache Tavily")
+    parser.add_argument("--reuse", action="store_true", help="Active la réutilisation des contacts connus")
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording)
+    backends = ("threads", "chat") if args.backend == "both" else (args.backend,)
+    print(f"Enregistrement {os.path.basename(args.recording)}, latences x{args.scale} : "
+          f"OCR {args.ocr_latency * args.scale:.2f}s, Tavily {args.search_latency * args.scale:.2f}s, "
+          f"génération {args.run_duration * args.scale:.2f}s, RTT {args.request_latency * args.scale:.3f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            db_path = os.path.join(directory, f"bench_{backend}.db")
+            migrate(connect(db_path))
+            bench_single(recording, args, backend, db_path)
+            bench_batch(recording, args, backend, db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Mesure l'effet du prétraitement des images sur la taille de l'upload, la
+latence OCR et l'exactitude des champs extraits.
+
+    python benchmarks/bench_preprocessing.py                  # cartes synthétiques, tailles seulement
+    python benchmarks/bench_preprocessing.py cartes/ --ocr    # vraies cartes, appels Mistral
+
+Avec --ocr, un fichier `expected.json` dans le dossier ({"carte.jpg": ["Doe",
+"john.doe@example.com", ...]}) permet de compter les champs retrouvés dans le
+texte OCR avant et après prétraitement.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from image_preprocessing import ImageOptions, detect_mime_type, preprocess_image
+
+
+def synthetic_cards(count=5):
+    """Photos simulées : carte claire sur fond sombre, 12 Mpx, orientation EXIF variable."""
+    cards = {}
+    for i in range(count):
+        photo = Image.new("RGB", (4032, 3024), (70 + i * 5, 65, 60))
+        draw = ImageDraw.Draw(photo)
+        draw.rectangle((900, 700, 3100, 2300), fill=(245, 245, 240))
+        for line, text in enumerate((f"Jean Dupont {i}", "Directeur commercial", f"jean.dupont{i}@example.com", "+33 6 12 34 56 78")):
+            draw.text((1000, 800 + line * 120), text, fill=(20, 20, 20))
+        exif = photo.getexif()
+        exif[0x0112] = (1, 6, 8, 3, 1)[i % 5]
+        buffer = io.BytesIO()
+        photo.save(buffer, format="JPEG", quality=95, exif=exif)
+        cards[f"synthetique_{i}.jpg"] = buffer.getvalue()
+    return cards
+
+
+def load_cards(directory):
+    cards = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(directory, name), "rb") as f:
+                cards[name] = f.read()
+    return cards
+
+
+def ocr(client, image_bytes, mime_type):
+    from pipeline import OCR_MODEL, extract_text_from_ocr_response, image_to_data_uri
+    start = time.perf_counter()
+    response = client.ocr.process(
+        model=OCR_MODEL,
+        document={"type": "image_url", "image_url": image_to_data_uri(image_bytes, mime_type)}
+    )
+    return extract_text_from_ocr_response(response), time.perf_counter() - start
+
+
+def field_accuracy(text, expected):
+    if not expected:
+        return None
+    lowered = text.lower()
+    return sum(1 for value in expected if value.lower() in lowered) / len(expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Dossier de photos de cartes (sinon cartes synthétiques)")
+    parser.add_argument("--ocr", action="store_true", help="Appelle Mistral OCR (MISTRAL_API_KEY requise)")
+    parser.add_argument("--max-dimension", type=int, default=ImageOptions.max_dimension)
+    parser.add_argument("--jpeg-quality", type=int, default=ImageOptions.jpeg_quality)
+    args = parser.parse_args(argv)
+
+    cards = load_cards(args.directory) if args.directory else synthetic_cards()
+    expected = {}
+    if args.directory and os.path.exists(os.path.join(args.directory, "expected.json")):
+        with open(os.path.join(args.directory, "expected.json"), encoding="utf-8") as f:
+            expected = json.load(f)
+    options = ImageOptions(max_dimension=args.max_dimension, jpeg_quality=args.jpeg_quality)
+
+    client = None
+    if args.ocr:
+        from mistralai import Mistral
+        client = Mistral(api_key=os.getenv("MISTRAL_API_KEY"))
+
+    totals = {"raw": 0, "processed": 0, "prep": 0.0, "ocr_raw": 0.0, "ocr_processed": 0.0}
+    print(f"{'carte':<24}{'avant':>10}{'après':>10}{'prép.':>8}" + ("{:>10}{:>10}{:>8}{:>8}".format("ocr av.", "ocr ap.", "acc av", "acc ap") if client else ""))
+    for name, raw in cards.items():
+        start = time.perf_counter()
+        processed, mime_type = preprocess_image(raw, options)
+        prep = time.perf_counter() - start
+        totals["raw"] += len(raw)
+        totals["processed"] += len(processed)
+        totals["prep"] += prep
+        line = f"{name:<24}{len(raw) / 1024:>8.0f}Ko{len(processed) / 1024:>8.0f}Ko{prep * 1000:>6.0f}ms"
+        if client:
+            text_raw, latency_raw = ocr(client, raw, detect_mime_type(raw))
+            text_processed, latency_processed = ocr(client, processed, mime_type)
+            totals["ocr_raw"] += latency_raw
+            totals["ocr_processed"] += latency_processed
+            acc_raw = field_accuracy(text_raw, expected.get(name))
+            acc_processed = field_accuracy(text_processed, expected.get(name))
+            fmt = lambda acc: "   -" if acc is None else f"{acc:.0%}"
+            line += f"{latency_raw:>9.2f}s{latency_processed:>9.2f}s{fmt(acc_raw):>8}{fmt(acc_processed):>8}"
+        print(line)
+
+    print(f"\nPayload total : {totals['raw'] / 1024:.0f} Ko -> {totals['processed'] / 1024:.0f} Ko "
+          f"({1 - totals['processed'] / totals['raw']:.0%} de moins), prétraitement {totals['prep']:.2f}s")
+    if client:
+        print(f"Latence OCR totale : {totals['ocr_raw']:.2f}s -> {totals['ocr_processed']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
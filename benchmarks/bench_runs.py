@@ -0,0 +1,64 @@
+"""
+Compare l'attente d'un run : ancien polling fixe d'une seconde, polling
+exponentiel et streaming, sur le client factice (aucun appel réseau).
+
+    python benchmarks/bench_runs.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_clients import FakeOpenAI
+from runs import execute_run
+
+
+def legacy_run(client, thread_id, assistant_id, tool_handler):
+    """Reproduction de l'ancien enchaînement : sleep(1) avant chaque retrieve, un seul tour d'outils."""
+    def wait(run_id):
+        while True:
+            time.sleep(1)
+            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+            if run.status in ["completed", "failed", "requires_action"]:
+                return run
+
+    run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id)
+    run = wait(run.id)
+    if run.status == "requires_action":
+        outputs = tool_handler(run.required_action.submit_tool_outputs.tool_calls)
+        run = client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs)
+        run = wait(run.id)
+    return run
+
+
+def echo_tools(tool_calls):
+    return [{"tool_call_id": call.id, "output": "ok"} for call in tool_calls]
+
+
+def measure(label, run_duration, tool_rounds, runner):
+    client = FakeOpenAI(run_duration=run_duration, tool_rounds=tool_rounds)
+    thread = client.beta.threads.create()
+    start = time.perf_counter()
+    run = runner(client, thread.id)
+    elapsed = time.perf_counter() - start
+    ideal = run_duration * (tool_rounds + 1)
+    print(f"{label:<10} durée={run_duration:.1f}s outils={tool_rounds} "
+          f"-> {elapsed:5.2f}s (idéal {ideal:.2f}s, surcoût {elapsed - ideal:+.2f}s) "
+          f"statut={run.status} retrieve={client.calls['runs.retrieve']}")
+
+
+def main():
+    for run_duration in (0.3, 1.2, 2.5):
+        for tool_rounds in (0, 1):
+            measure("legacy", run_duration, tool_rounds,
+                    lambda c, t: legacy_run(c, t, "asst", echo_tools))
+            measure("poll", run_duration, tool_rounds,
+                    lambda c, t: execute_run(c, t, "asst", echo_tools, stream=False).run)
+            measure("stream", run_duration, tool_rounds,
+                    lambda c, t: execute_run(c, t, "asst", echo_tools).run)
+        print()
+
+
+if __name__ == "__main__":
+    main()
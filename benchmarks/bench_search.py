@@ -0,0 +1,117 @@
+"""
+Compare la recherche plein texte FTS5 à un scan LIKE sur une base
+synthétique de leads (100 000 lignes par défaut).
+
+    python benchmarks/bench_search.py [--rows 100000] [--db /tmp/leads_bench.db]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import connect
+from leads_repository import SEARCH_COLUMNS, search_leads
+from migrations import migrate
+
+FIRST_NAMES = ["Jean", "Marie", "Hélène", "Paul", "Sophie", "Karim", "Léa", "Thomas", "Nadia", "Louis"]
+LAST_NAMES = ["Dupont", "Martin", "Bernard", "Petit", "Durand", "Leroy", "Moreau", "Fournier", "Girard", "Lambert"]
+COMPANIES = ["Acme", "Zeta", "Orion", "Nova", "Helix", "Quanta", "Vertex", "Atlas", "Lumen", "Pixel"]
+WORDS = ("intelligence artificielle formation audit module marketing données client stratégie "
+         "automatisation support industrie logistique santé finance énergie innovation équipe").split()
+SYLLABLES = ["ca", "ro", "mi", "len", "tar", "vo", "quel", "pri", "dan", "sel", "or", "bu", "fi", "ten", "sa"]
+QUERIES = ["dupont", "acme", "audit logistique", "helene.martin", "caromi", "zzzintrouvable"]
+
+
+def build_database(path, rows):
+    conn = connect(path)
+    # Base antérieure aux migrations : seule la table `leads` existe, sans index.
+    conn.execute("""
+        CREATE TABLE leads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ocr_text TEXT, nom TEXT, prenom TEXT, telephone TEXT,
+            mail TEXT, agent1 TEXT, agent2 TEXT, agent3 TEXT, qualification TEXT, note TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    rng = random.Random(42)
+    # Vocabulaire à distribution de Zipf : quelques mots très fréquents, une longue traîne de mots rares.
+    vocabulary = WORDS + sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(8000)})
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def text(n):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=n))
+
+    batch = []
+    conn.execute("BEGIN")
+    for i in range(rows):
+        first, last, company = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(COMPANIES)
+        mail = f"{first.lower()}.{last.lower()}{i}@{company.lower()}.fr"
+        batch.append((f"{first} {last}\n{company}\n{mail}", last, first, "0600000000", mail,
+                      f"{first} {last} travaille chez {company}. " + text(60), text(80), text(120),
+                      "Smart Talk", text(15)))
+        if len(batch) == 5000:
+            conn.executemany("INSERT INTO leads (ocr_text, nom, prenom, telephone, mail, agent1, agent2, agent3, "
+                             "qualification, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO leads (ocr_text, nom, prenom, telephone, mail, agent1, agent2, agent3, "
+                         "qualification, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.execute("COMMIT")
+    return conn
+
+
+def like_search(conn, text, limit=50):
+    """Scan LIKE sur toutes les colonnes ; avec `limit`, s'arrête aux premiers résultats (non classés)."""
+    clauses, params = [], []
+    for term in text.split():
+        clauses.append("(" + " OR ".join(f"{column} LIKE ?" for column in SEARCH_COLUMNS) + ")")
+        params.extend([f"%{term}%"] * len(SEARCH_COLUMNS))
+    sql = f"SELECT id FROM leads WHERE {' AND '.join(clauses)} ORDER BY timestamp DESC"
+    if limit is None:
+        return conn.execute(sql, params).fetchall()
+    return conn.execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "leads_search_bench.db"))
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    start = time.perf_counter()
+    conn = build_database(args.db, args.rows)
+    print(f"Base de {args.rows} leads créée en {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"Migrations appliquées (index et FTS5 remplis sur les lignes existantes) en {time.perf_counter() - start:.1f}s\n")
+
+    # LIKE 50 : s'arrête dès 50 lignes trouvées dans l'ordre chronologique, sans classement.
+    # LIKE tout : parcourt toute la table, comme il le faut pour classer par pertinence.
+    print(f"{'requête':<20}{'LIKE 50':>10}{'LIKE tout':>11}{'FTS5':>10}   résultats (LIKE tout / FTS5)")
+    for query in QUERIES:
+        like_time, _ = timed(lambda: like_search(conn, query))
+        like_all_time, like_all_count = timed(lambda: like_search(conn, query, limit=None), repeat=2)
+        fts_time, fts_count = timed(lambda: search_leads(conn, query))
+        print(f"{query:<20}{like_time * 1000:>8.1f}ms{like_all_time * 1000:>9.1f}ms{fts_time * 1000:>8.1f}ms"
+              f"   {like_all_count} / {fts_count}")
+    conn.close()
+    os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compare les tokens envoyés à chaque assistant entre le mode texte libre et
+le mode sortie structurée (JSON de l'assistant 1, champs compacts pour les
+assistants 2 et 3), sur le client factice.
+
+    python benchmarks/bench_structured.py
+"""
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_clients import FakeOpenAI
+from pipeline import Clients, process_card
+
+ASSISTANT_IDS = {"extraction": "asst_texte", "extraction_structured": "asst_json", "product": "asst_produit", "email": "asst_mail"}
+
+# Réponse typique de l'assistant 1 en texte libre après repli d'un contexte Tavily volumineux.
+FREE_TEXT_REPLY = (
+    "Nom: Dupont\nPrénom: Jean\nTéléphone: +33 6 12 34 56 78\nMail: jean.dupont@example.com\n"
+    "Entreprise: Example Corp\n\n" + "Example Corp est un éditeur de logiciels B2B. " * 300
+)
+JSON_REPLY = json.dumps({
+    "nom": "Dupont", "prenom": "Jean", "telephone": "+33 6 12 34 56 78", "mail": "jean.dupont@example.com",
+    "entreprise": "Example Corp",
+    "resume": "Jean Dupont dirige les ventes d'Example Corp, éditeur de logiciels B2B de 200 personnes "
+              "qui cherche à automatiser son support client.",
+}, ensure_ascii=False)
+MATCHING_REPLY = "Formation IA Générative pour le Marketing Digital, module Analyse de Sentiments. " * 10
+
+
+def run(structured):
+    openai = FakeOpenAI(run_duration=0, replies={
+        "asst_texte": FREE_TEXT_REPLY, "asst_json": JSON_REPLY, "asst_produit": MATCHING_REPLY,
+    })
+    mistral = SimpleNamespace(ocr=SimpleNamespace(process=lambda **kwargs: SimpleNamespace(
+        pages=[SimpleNamespace(markdown="Jean Dupont\nExample Corp\njean.dupont@example.com")]
+    )))
+    clients = Clients(openai=openai, mistral=mistral, tavily=None, assistant_ids=ASSISTANT_IDS,
+                      image_options=None, structured_output=structured)
+    lead = process_card(clients, b"carte", "Smart Talk", "Rencontré au salon, intéressé par l'IA.")
+    return {stage: run.usage for stage, run in lead["runs"].items()}
+
+
+def main():
+    results = {"texte libre": run(False), "structuré": run(True)}
+    print(f"{'étape':<8}" + "".join(f"{mode:>24}" for mode in results))
+    for stage in ("agent1", "agent2", "agent3"):
+        print(f"{stage:<8}" + "".join(
+            f"{usage[stage]['prompt_tokens']:>12} in {usage[stage]['completion_tokens']:>6} out" for usage in results.values()
+        ))
+    for mode, usage in results.items():
+        print(f"Total {mode} : {sum(u['total_tokens'] for u in usage.values())} tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Backend « chat » : chaque assistant est exécuté comme une requête Chat
+Completions en streaming, avec les mêmes instructions et le même outil
+`tavily_search` que l'assistant OpenAI correspondant.
+
+Là où le backend « threads » enchaîne threads.create, messages.create,
+runs.create, le suivi du run puis messages.list, une étape ne coûte ici
+qu'une requête HTTP par tour d'outils, et aucun thread n'est laissé côté
+OpenAI.
+"""
+import time
+from types import SimpleNamespace
+
+from assistants import ASSISTANT_SPECS
+from runs import (DEFAULT_DEADLINE, DEFAULT_MAX_TOOL_ROUNDS, RunResult, RunTimeoutError, ToolRoundsExceededError,
+                  direct_request, iter_with_deadline, record_run)
+
+# Seul "stop" marque une réponse complète ; une raison absente (flux coupé avant
+# le chunk de fin) ou inconnue donne "incomplete", comme "length" ou "content_filter".
+FINISH_STATUSES = {"stop": "completed"}
+
+
+def _accumulate(stream, expires_at):
+    """
+    Reconstitue la réponse à partir des chunks : texte, appels d'outils
+    (arguments concaténés par index), raison de fin et usage. Lève
+    RunTimeoutError si le flux n'est pas terminé à `expires_at`.
+    """
+    content, tool_calls, finish_reason, usage = [], {}, None, None
+    for chunk in iter_with_deadline(stream, expires_at, "Réponse Chat Completions"):
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        for choice in chunk.choices or []:
+            delta = choice.delta
+            if getattr(delta, "content", None):
+                content.append(delta.content)
+            for call in getattr(delta, "tool_calls", None) or []:
+                entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
+                if call.id:
+                    entry["id"] = call.id
+                if call.function and call.function.name:
+                    entry["name"] = call.function.name
+                if call.function and call.function.arguments:
+                    entry["arguments"] += call.function.arguments
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    calls = [
+        SimpleNamespace(id=entry["id"], type="function",
+                        function=SimpleNamespace(name=entry["name"], arguments=entry["arguments"]))
+        for _, entry in sorted(tool_calls.items())
+    ]
+    return "".join(content), calls, finish_reason, usage
+
+
+def run_chat_agent(client, assistant_key, user_message, tool_handler=None,
+                   max_tool_rounds=DEFAULT_MAX_TOOL_ROUNDS, specs=None, request=direct_request,
+                   deadline=DEFAULT_DEADLINE):
+    """
+    Exécute l'assistant `assistant_key` en une conversation Chat Completions.
+    Retourne (réponse, RunResult) comme le backend « threads ». Chaque requête
+    passe par `request(fn, *args, **kwargs)` (limites et retries, voir runs.py) ;
+    `deadline` borne la conversation entière, tours d'outils compris.
+    """
+    spec = (specs or ASSISTANT_SPECS)[assistant_key]
+    tool_handler = tool_handler or (lambda tool_calls: [])
+    messages = [
+        {"role": "system", "content": spec["instructions"].strip()},
+        {"role": "user", "content": user_message},
+    ]
+    kwargs = {"model": spec["model"], "stream": True, "stream_options": {"include_usage": True}}
+    if spec.get("tools"):
+        kwargs["tools"] = spec["tools"]
+    if spec.get("response_format"):
+        kwargs["response_format"] = spec["response_format"]
+
+    start = time.perf_counter()
+    expires_at = time.monotonic() + deadline
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    tool_rounds = 0
+    while True:
+        if time.monotonic() >= expires_at:
+            raise RunTimeoutError(f"Assistant '{assistant_key}' : pas de réponse après {deadline}s")
+        content, tool_calls, finish_reason, usage = _accumulate(
+            request(client.chat.completions.create, messages=messages, **kwargs), expires_at
+        )
+        for key in totals:
+            totals[key] += getattr(usage, key, 0) or 0
+        if finish_reason != "tool_calls" or not tool_calls:
+            break
+        tool_rounds += 1
+        if tool_rounds > max_tool_rounds:
+            raise ToolRoundsExceededError(f"Assistant '{assistant_key}' : plus de {max_tool_rounds} tours d'outils")
+        messages.append({
+            "role": "assistant",
+            "content": content or None,
+            "tool_calls": [
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in tool_calls
+            ],
+        })
+        for output in tool_handler(tool_calls):
+            messages.append({"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]})
+
+    status = FINISH_STATUSES.get(finish_reason, "incomplete")
+    run = SimpleNamespace(id=f"chat:{assistant_key}", status=status, usage=SimpleNamespace(**totals))
+    return content.strip(), record_run(RunResult(run, "chat", time.perf_counter() - start, tool_rounds))
@@ -0,0 +1,66 @@
+"""
+Normalisation des coordonnées servant à reconnaître un contact déjà scanné.
+
+Les mails sont comparés en minuscules, les téléphones au format E.164
+(« 06 12 34 56 78 » et « +33 (0)6 12-34-56-78 » donnent tous deux
+« +33612345678 »). Les numéros sans indicatif sont supposés français.
+Les boîtes génériques (contact@, info@...) ne désignent pas une personne et
+ne servent pas à reconnaître un contact.
+"""
+import re
+
+DEFAULT_COUNTRY_CODE = "33"
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?:\+|\b00|\b0)?\d[\d\s().-]{6,}\d")
+ROLE_MAILBOXES = frozenset((
+    "accueil", "admin", "bonjour", "commercial", "communication", "compta", "comptabilite", "contact",
+    "direction", "hello", "info", "infos", "marketing", "office", "rh", "sales", "secretariat", "service",
+    "support", "team", "vente", "ventes",
+))
+
+
+def normalize_email(value):
+    """Premier mail trouvé dans `value`, en minuscules ; None s'il n'y en a pas."""
+    match = EMAIL_RE.search(value or "")
+    return match.group(0).lower() if match else None
+
+
+def normalize_phone(value, country_code=DEFAULT_COUNTRY_CODE):
+    """Premier numéro trouvé dans `value` au format E.164 ; None s'il n'y en a pas."""
+    match = PHONE_RE.search((value or "").replace("(0)", ""))
+    if not match:
+        return None
+    raw = match.group(0)
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = country_code + digits[1:]
+    elif len(digits) == 9:
+        digits = country_code + digits
+    else:
+        return None
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def is_role_mailbox(mail):
+    """Vrai pour une boîte partagée (contact@, info@, sales@...) d'après sa partie locale."""
+    local = (mail or "").split("@", 1)[0].lower()
+    return re.split(r"[._+-]", local)[0].rstrip("0123456789") in ROLE_MAILBOXES
+
+
+def personal_emails(mails):
+    """`mails` sans les boîtes partagées."""
+    return [mail for mail in mails if mail and not is_role_mailbox(mail)]
+
+
+def find_contacts(text):
+    """Mails et téléphones normalisés présents dans un texte libre (texte OCR d'une carte)."""
+    mails = {normalize_email(match.group(0)) for match in EMAIL_RE.finditer(text or "")}
+    phones = {normalize_phone(match.group(0)) for match in PHONE_RE.finditer((text or "").replace("(0)", ""))}
+    return sorted(mails - {None}), sorted(phones - {None})
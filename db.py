@@ -0,0 +1,140 @@
+"""
+Accès à la base SQLite `leads.db`.
+
+Chaque thread obtient sa propre connexion (les sessions Streamlit, les
+workers du mode lot et les caches ne partagent jamais un curseur). Streamlit
+lance un nouveau thread à chaque rerun et à chaque rafraîchissement de
+fragment : à la fin d'un thread, sa connexion retourne dans un petit pool
+par base et sert au thread suivant, sans nouvelle ouverture ni PRAGMA. Les
+connexions passent en mode WAL — les lectures ne bloquent plus les
+écritures — avec un délai d'attente sur verrou, et les écritures passent par
+des transactions `BEGIN IMMEDIATE` pour éviter les « database is locked »
+lors de la montée en verrou d'écriture.
+"""
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from contacts import normalize_email, normalize_phone
+from metrics import INSERT_METRIC_SQL, Span, metric_rows
+
+DB_PATH = "leads.db"
+BUSY_TIMEOUT = 30.0
+# Connexions inactives conservées par base ; les suivantes sont fermées.
+MAX_IDLE_CONNECTIONS = 8
+
+INSERT_LEAD_SQL = (
+    "INSERT INTO leads (ocr_text, nom, prenom, telephone, mail, agent1, agent2, agent3, qualification, note, "
+    "mail_normalized, telephone_normalized, reused_from) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_local = threading.local()
+_idle_connections = {}
+_idle_lock = threading.Lock()
+
+
+class _Lease:
+    """Conservé dans le stockage local du thread : sa destruction (fin du thread) rend la connexion."""
+
+
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """Ouvre une connexion configurée (WAL, busy timeout, synchronous NORMAL)."""
+    # isolation_level=None : les transactions sont ouvertes explicitement par `transaction()`.
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                           check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+    return conn
+
+
+def _release(db_path, conn):
+    """Remet la connexion d'un thread terminé dans le pool (ou la ferme s'il est plein)."""
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+    with _idle_lock:
+        idle = _idle_connections.setdefault(db_path, [])
+        if len(idle) < MAX_IDLE_CONNECTIONS:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def get_connection(db_path=DB_PATH):
+    """
+    Connexion propre au thread courant, prise dans le pool (ou ouverte) au
+    premier appel et rendue au pool à la fin du thread.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+        _local.leases = []
+    conn = connections.get(db_path)
+    if conn is None:
+        with _idle_lock:
+            idle = _idle_connections.get(db_path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            # Utilisée par un seul thread à la fois, mais par plusieurs threads successifs.
+            conn = connect(db_path, check_same_thread=False)
+        connections[db_path] = conn
+        lease = _Lease()
+        weakref.finalize(lease, _release, db_path, conn)
+        _local.leases.append(lease)
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """Transaction d'écriture : BEGIN IMMEDIATE, COMMIT en sortie, ROLLBACK sur exception."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+##############################
+# Leads                      #
+##############################
+def lead_row(lead):
+    """Tuple de valeurs pour INSERT_LEAD_SQL (mail et téléphone normalisés compris)."""
+    return (lead["ocr_text"], lead["nom"], lead["prenom"], lead["telephone"], lead["mail"],
+            lead["agent1"], lead["agent2"], lead["agent3"], lead["qualification"], lead["note"],
+            normalize_email(lead["mail"]), normalize_phone(lead["telephone"]), lead.get("reused_from"))
+
+
+def add_lead(conn, lead):
+    """
+    INSERT du lead dans la transaction en cours ; ses spans (voir metrics.py),
+    complétés par la durée de l'insertion, sont écrits dans `lead_metrics`.
+    """
+    start = time.perf_counter()
+    lead_id = conn.execute(INSERT_LEAD_SQL, lead_row(lead)).lastrowid
+    spans = lead.get("spans")
+    if spans is not None:
+        spans.append(Span("db_insert", time.perf_counter() - start))
+        conn.executemany(INSERT_METRIC_SQL, metric_rows(lead_id, spans))
+    return lead_id
+
+
+def insert_lead(conn, lead):
+    """Enregistre le lead dans la table `leads` et retourne son id."""
+    with transaction(conn):
+        return add_lead(conn, lead)
+
+
+def insert_leads(conn, leads):
+    """Enregistre plusieurs leads en une seule transaction ; retourne leurs ids dans l'ordre."""
+    with transaction(conn):
+        return [add_lead(conn, lead) for lead in leads]
+
+
+def delete_all_leads(conn):
+    with transaction(conn):
+        conn.execute("DELETE FROM leads")
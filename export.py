@@ -0,0 +1,172 @@
+"""
+Export des leads en CSV, Parquet ou vCard.
+
+Les lignes sont lues par paquets (`fetchmany`) et écrites au fil de l'eau :
+la mémoire utilisée ne dépend pas de la taille de la table. Les filtres
+sont ceux de la page des leads (période, qualification). Le Parquet
+nécessite pyarrow (dépendance optionnelle).
+
+    python export.py --format csv --from 2024-06-01 --qualification "Smart Talk" -o leads.csv
+"""
+import argparse
+import codecs
+import csv
+import re
+import sys
+from datetime import date
+
+from db import DB_PATH, connect
+from leads_repository import DETAIL_COLUMNS, LeadFilters
+from migrations import migrate
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_COLUMNS = DETAIL_COLUMNS + ("mail_normalized", "telephone_normalized")
+DEFAULT_CHUNK_SIZE = 1000
+PARQUET_CHUNK_SIZE = 10000
+
+
+def iter_lead_chunks(conn, filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lignes (tuples des EXPORT_COLUMNS) par paquets de `chunk_size`, dans l'ordre des ids."""
+    clauses, params = (filters or LeadFilters()).where()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM leads {where} ORDER BY id", params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+##############################
+# Formats                    #
+##############################
+def write_csv(conn, out, filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """CSV UTF-8 avec BOM (ouvert correctement par Excel) ; retourne le nombre de leads."""
+    out.write(codecs.BOM_UTF8)
+    text = codecs.getwriter("utf-8")(out)
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for rows in iter_lead_chunks(conn, filters, chunk_size):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def write_parquet(conn, out, filters=None, chunk_size=PARQUET_CHUNK_SIZE):
+    """Parquet, un row group par paquet ; retourne le nombre de leads."""
+    if pa is None:
+        raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow).")
+    integer_columns = {"id", "reused_from"}
+    schema = pa.schema([(c, pa.int64() if c in integer_columns else pa.string()) for c in EXPORT_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in iter_lead_chunks(conn, filters, chunk_size):
+            columns = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            count += len(rows)
+    return count
+
+
+def _vcard_escape(value):
+    return (str(value or "").replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _vcard_fold(line):
+    """Replie les lignes de plus de 75 octets (RFC 6350), sans couper un caractère UTF-8."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current = [], b""
+    for char in line:
+        data = char.encode("utf-8")
+        if len(current) + len(data) > (75 if not parts else 74):
+            parts.append(current)
+            current = b""
+        current += data
+    parts.append(current)
+    return "\r\n ".join(part.decode("utf-8") for part in parts) + "\r\n"
+
+
+def lead_vcard(lead):
+    """vCard 3.0 d'un lead (dict des EXPORT_COLUMNS)."""
+    company = re.search(r"^Entreprise\s*:\s*(.+)$", lead["agent1"] or "", re.MULTILINE)
+    full_name = " ".join(part for part in (lead["prenom"], lead["nom"]) if part) or lead["mail"] or f"Lead {lead['id']}"
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        f"N:{_vcard_escape(lead['nom'])};{_vcard_escape(lead['prenom'])};;;",
+        f"FN:{_vcard_escape(full_name)}",
+    ]
+    if company:
+        lines.append(f"ORG:{_vcard_escape(company.group(1).strip())}")
+    if lead["mail"]:
+        lines.append(f"EMAIL;TYPE=INTERNET:{_vcard_escape(lead['mail_normalized'] or lead['mail'])}")
+    if lead["telephone"]:
+        lines.append(f"TEL;TYPE=VOICE:{_vcard_escape(lead['telephone_normalized'] or lead['telephone'])}")
+    note = f"Qualification : {lead['qualification'] or ''}\nNote : {lead['note'] or ''}"
+    lines += [
+        f"NOTE:{_vcard_escape(note)}",
+        f"UID:lead-{lead['id']}",
+        f"REV:{(lead['timestamp'] or '').replace(' ', 'T')}",
+        "END:VCARD",
+    ]
+    return "".join(_vcard_fold(line) for line in lines)
+
+
+def write_vcard(conn, out, filters=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Fichier .vcf contenant une vCard par lead ; retourne le nombre de leads."""
+    count = 0
+    for rows in iter_lead_chunks(conn, filters, chunk_size):
+        out.write("".join(lead_vcard(dict(zip(EXPORT_COLUMNS, row))) for row in rows).encode("utf-8"))
+        count += len(rows)
+    return count
+
+
+# Format : (fonction d'écriture, type MIME, extension)
+EXPORT_FORMATS = {
+    "csv": (write_csv, "text/csv", "csv"),
+    "parquet": (write_parquet, "application/vnd.apache.parquet", "parquet"),
+    "vcard": (write_vcard, "text/vcard", "vcf"),
+}
+
+
+def export_leads(conn, export_format, out, filters=None):
+    """Écrit les leads filtrés dans `out` (fichier binaire) ; retourne le nombre de leads."""
+    writer = EXPORT_FORMATS[export_format][0]
+    return writer(conn, out, filters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export des leads (CSV, Parquet, vCard).")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (par défaut : sortie standard)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="Date de début (AAAA-MM-JJ)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Date de fin incluse (AAAA-MM-JJ)")
+    parser.add_argument("--qualification")
+    args = parser.parse_args(argv)
+    if args.format == "parquet" and pa is None:
+        parser.error("l'export Parquet nécessite pyarrow (pip install pyarrow)")
+
+    conn = connect(args.db)
+    migrate(conn)
+    filters = LeadFilters(qualification=args.qualification, date_from=args.date_from, date_to=args.date_to)
+    if args.output:
+        with open(args.output, "wb") as out:
+            count = export_leads(conn, args.format, out, filters)
+    else:
+        count = export_leads(conn, args.format, sys.stdout.buffer, filters)
+        sys.stdout.buffer.flush()
+    print(f"{count} lead(s) exporté(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
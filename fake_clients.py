@@ -0,0 +1,334 @@
+"""
+Clients factices pour exécuter le pipeline hors ligne.
+
+FakeOpenAI reproduit le sous-ensemble de l'API Assistants utilisé par
+l'application (threads, messages, runs en polling et en streaming) ainsi que
+Chat Completions en streaming, avec une durée de génération et une latence
+réseau par requête simulées, afin de mesurer le comportement temporel sans réseau.
+FakeMistral et FakeTavily rejouent des réponses enregistrées (voir
+`load_recording`) avec leur propre latence simulée.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from assistants import ASSISTANT_SPECS
+
+
+def _ns(**kwargs):
+    return SimpleNamespace(**kwargs)
+
+
+class FakeOpenAI:
+    """
+    Stub de `openai.OpenAI`. Chaque run dure `run_duration` secondes par étape ;
+    s'il reste des `tool_rounds`, l'étape se termine en `requires_action` avec
+    `tool_calls_per_round` appels à `tavily_search`. `replies` permet de fixer
+    la réponse par identifiant d'assistant ; l'usage en tokens est estimé à
+    partir de la longueur des messages (4 caractères par token). Chaque appel
+    d'API coûte en plus `request_latency` secondes (aller-retour HTTP).
+    Les clés de `replies` sont des identifiants d'assistant ou des clés
+    d'ASSISTANT_SPECS ("extraction_structured", "product", "email"...) : ces
+    dernières servent aussi au backend « chat », reconnu à ses instructions.
+    """
+
+    def __init__(self, run_duration=1.0, tool_rounds=0, tool_calls_per_round=1,
+                 reply="Nom: Doe\nPrénom: John\nTéléphone: 0123456789\nMail: john.doe@example.com",
+                 replies=None, supports_stream=True, request_latency=0.0):
+        self.run_duration = run_duration
+        self.request_latency = request_latency
+        self.tool_rounds = tool_rounds
+        self.tool_calls_per_round = tool_calls_per_round
+        self.reply = reply
+        self.replies = replies or {}
+        self.supports_stream = supports_stream
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._messages = {}
+        self.beta = _ns(
+            assistants=_FakeAssistants(self),
+            threads=_FakeThreads(self),
+        )
+        self.chat = _ns(completions=_FakeChatCompletions(self))
+
+    def reply_for(self, assistant):
+        """Réponse pour un identifiant d'assistant (ou une clé d'ASSISTANT_SPECS)."""
+        if assistant in self.replies:
+            return self.replies[assistant]
+        name = getattr(self.beta.assistants.items.get(assistant), "name", None)
+        return self.replies.get(name, self.reply)
+
+    def _next_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_{next(self._ids)}"
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        if self.request_latency:
+            time.sleep(self.request_latency)
+
+    # --- cycle de vie simulé d'un run ---
+    def _new_run(self, thread_id, assistant_id):
+        run = _ns(id=self._next_id("run"), thread_id=thread_id, assistant_id=assistant_id,
+                  status="queued", required_action=None,
+                  usage=_ns(prompt_tokens=0, completion_tokens=0, total_tokens=0))
+        self._runs[run.id] = {"run": run, "started": time.monotonic(), "rounds_left": self.tool_rounds}
+        return run
+
+    def _tool_calls(self):
+        return [
+            _ns(id=self._next_id("call"), type="function",
+                function=_ns(name="tavily_search", arguments=json.dumps({"query": f"requête {i}"})))
+            for i in range(self.tool_calls_per_round)
+        ]
+
+    def _finish_step(self, state):
+        """Fait passer le run à l'état de fin de l'étape courante."""
+        run = state["run"]
+        if state["rounds_left"] > 0:
+            run.status = "requires_action"
+            run.required_action = _ns(submit_tool_outputs=_ns(tool_calls=self._tool_calls()))
+        else:
+            run.status = "completed"
+            run.required_action = None
+            reply = self.reply_for(run.assistant_id)
+            prompt_chars = sum(len(c["text"]) for m in self._messages.get(run.thread_id, []) for c in m.content)
+            prompt_chars += sum(len(o["output"]) for o in state.get("tool_outputs", []))
+            prompt_tokens, completion_tokens = prompt_chars // 4, len(reply) // 4
+            run.usage = _ns(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            total_tokens=prompt_tokens + completion_tokens)
+            self._messages.setdefault(run.thread_id, []).insert(
+                0, _ns(role="assistant", content=[{"text": reply}])
+            )
+        return run
+
+    def _refresh(self, run_id):
+        state = self._runs[run_id]
+        run = state["run"]
+        if run.status in ("queued", "in_progress"):
+            if time.monotonic() - state["started"] >= self.run_duration:
+                self._finish_step(state)
+            else:
+                run.status = "in_progress"
+        return run
+
+    def _submit(self, run_id, tool_outputs):
+        state = self._runs[run_id]
+        if state["run"].status != "requires_action":
+            raise ValueError(f"Run {run_id} n'attend pas de sortie d'outil")
+        state["rounds_left"] -= 1
+        state["run"].status = "queued"
+        state["run"].required_action = None
+        state["started"] = time.monotonic()
+        state.setdefault("tool_outputs", []).extend(tool_outputs)
+        return state["run"]
+
+    def _new_step(self, run, step_type):
+        return _ns(id=self._next_id("step"), object="thread.run.step", run_id=run.id, type=step_type,
+                   status="in_progress", usage=None)
+
+    def _event_stream(self, run_id):
+        """
+        Événements d'une étape du run, dans l'ordre de l'API : l'étape d'outils
+        soumise se termine (`thread.run.step.completed`) avant que l'assistant
+        ne reprenne, puis une étape `tool_calls` ou `message_creation` est créée.
+        """
+        state = self._runs[run_id]
+        run = state["run"]
+        yield _ns(event="thread.run.queued", data=run)
+        run.status = "in_progress"
+        yield _ns(event="thread.run.in_progress", data=run)
+        tool_step = state.pop("tool_step", None)
+        if tool_step is not None:
+            tool_step.status = "completed"
+            yield _ns(event="thread.run.step.completed", data=tool_step)
+        time.sleep(self.run_duration)
+        self._finish_step(state)
+        if run.status == "requires_action":
+            state["tool_step"] = self._new_step(run, "tool_calls")
+            yield _ns(event="thread.run.step.created", data=state["tool_step"])
+        else:
+            step = self._new_step(run, "message_creation")
+            yield _ns(event="thread.run.step.created", data=step)
+            step.status = "completed"
+            yield _ns(event="thread.run.step.completed", data=step)
+        yield _ns(event=f"thread.run.{run.status}", data=run)
+
+
+class _FakeAssistants:
+    def __init__(self, root):
+        self.root = root
+        self.items = {}
+
+    def create(self, **kwargs):
+        self.root._count("assistants.create")
+        assistant = _ns(id=self.root._next_id("asst"), metadata=kwargs.get("metadata") or {}, **{
+            k: v for k, v in kwargs.items() if k != "metadata"
+        })
+        self.items[assistant.id] = assistant
+        return assistant
+
+    def retrieve(self, assistant_id):
+        self.root._count("assistants.retrieve")
+        if assistant_id not in self.items:
+            error = Exception(f"No assistant found with id '{assistant_id}'")
+            error.status_code = 404
+            raise error
+        return self.items[assistant_id]
+
+    def list(self, limit=100):
+        return list(self.items.values())
+
+    def delete(self, assistant_id):
+        self.root._count("assistants.delete")
+        self.items.pop(assistant_id, None)
+
+
+class _FakeThreads:
+    def __init__(self, root):
+        self.root = root
+        self.messages = _FakeMessages(root)
+        self.runs = _FakeRuns(root)
+
+    def create(self, **kwargs):
+        self.root._count("threads.create")
+        return _ns(id=self.root._next_id("thread"))
+
+
+class _FakeMessages:
+    def __init__(self, root):
+        self.root = root
+
+    def create(self, thread_id, role, content):
+        self.root._count("messages.create")
+        message = _ns(id=self.root._next_id("msg"), role=role, content=[{"text": content}])
+        self.root._messages.setdefault(thread_id, []).insert(0, message)
+        return message
+
+    def list(self, thread_id, **kwargs):
+        self.root._count("messages.list")
+        return list(self.root._messages.get(thread_id, []))
+
+
+class _FakeRuns:
+    def __init__(self, root):
+        self.root = root
+
+    def create(self, thread_id, assistant_id, stream=False, **kwargs):
+        if stream and not self.root.supports_stream:
+            raise TypeError("create() got an unexpected keyword argument 'stream'")
+        self.root._count("runs.create")
+        run = self.root._new_run(thread_id, assistant_id)
+        return self.root._event_stream(run.id) if stream else run
+
+    def retrieve(self, thread_id, run_id):
+        self.root._count("runs.retrieve")
+        return self.root._refresh(run_id)
+
+    def cancel(self, thread_id, run_id):
+        self.root._count("runs.cancel")
+        run = self.root._runs[run_id]["run"]
+        run.status = "cancelled"
+        return run
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs, stream=False):
+        self.root._count("runs.submit_tool_outputs")
+        run = self.root._submit(run_id, tool_outputs)
+        return self.root._event_stream(run.id) if stream else run
+
+
+class _FakeChatCompletions:
+    """Chat Completions en streaming : un tour d'outils par message `tool` manquant."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def create(self, model, messages, stream=False, **kwargs):
+        self.root._count("chat.completions.create")
+        rounds_done = sum(1 for m in messages if m["role"] == "assistant" and m.get("tool_calls"))
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        key = next((key for key, spec in ASSISTANT_SPECS.items()
+                    if spec["instructions"].strip() == messages[0]["content"]), None)
+        return self._stream(self.root.reply_for(key), rounds_done, prompt_tokens)
+
+    def _stream(self, reply, rounds_done, prompt_tokens):
+        root = self.root
+        time.sleep(root.run_duration)
+        if rounds_done < root.tool_rounds:
+            for index, call in enumerate(root._tool_calls()):
+                yield _ns(usage=None, choices=[_ns(finish_reason=None, delta=_ns(content=None, tool_calls=[
+                    _ns(index=index, id=call.id, function=_ns(name=call.function.name, arguments=call.function.arguments))
+                ]))])
+            finish_reason, completion_tokens = "tool_calls", 20
+        else:
+            for start in range(0, len(reply), 50):
+                yield _ns(usage=None, choices=[_ns(finish_reason=None, delta=_ns(content=reply[start:start + 50], tool_calls=None))])
+            finish_reason, completion_tokens = "stop", len(reply) // 4
+        yield _ns(usage=None, choices=[_ns(finish_reason=finish_reason, delta=_ns(content=None, tool_calls=None))])
+        yield _ns(choices=[], usage=_ns(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                        total_tokens=prompt_tokens + completion_tokens))
+
+
+class FakeMistral:
+    """
+    Stub de `mistralai.Mistral` : `ocr.process` renvoie tour à tour les textes
+    de `pages` (un markdown par carte) après `latency` secondes.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._pages = itertools.cycle(pages)
+        self._lock = threading.Lock()
+        self.ocr = _ns(process=self._process)
+
+    def _process(self, model, document, **kwargs):
+        with self._lock:
+            self.calls["ocr.process"] += 1
+            markdown = next(self._pages)
+        if self.latency:
+            time.sleep(self.latency)
+        return _ns(pages=[_ns(markdown=markdown)])
+
+
+class FakeTavily:
+    """Stub de `TavilyClient` : contexte enregistré par requête (sinon `default`) après `latency` secondes."""
+
+    def __init__(self, contexts=None, default="", latency=0.0):
+        self.contexts = contexts or {}
+        self.default = default
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def get_search_context(self, query, **kwargs):
+        with self._lock:
+            self.calls["get_search_context"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.contexts.get(query, self.default)
+
+
+def load_recording(path):
+    """
+    Charge un enregistrement JSON : {"ocr": [markdown, ...], "search": {"default":
+    ..., "contexts": {requête: contexte}}, "replies": {clé d'assistant: réponse}}.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fake_clients_from_recording(recording, ocr_latency=0.0, search_latency=0.0, **openai_kwargs):
+    """(FakeOpenAI, FakeMistral, FakeTavily) qui rejouent `recording`."""
+    search = recording.get("search", {})
+    return (
+        FakeOpenAI(replies=recording.get("replies"), **openai_kwargs),
+        FakeMistral(recording["ocr"], latency=ocr_latency),
+        FakeTavily(search.get("contexts"), search.get("default", ""), latency=search_latency),
+    )
@@ -0,0 +1,107 @@
+"""
+Préparation des photos de cartes avant l'OCR.
+
+Les photos de téléphone font plusieurs Mo : on applique la rotation EXIF,
+on recadre sur la carte, on réduit à `max_dimension` pixels et on réencode
+en JPEG, ce qui allège l'upload et accélère l'OCR sans perdre de lisibilité.
+"""
+import io
+from dataclasses import dataclass
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+# Signatures binaires des formats acceptés par l'uploader.
+MAGIC_MIME_TYPES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+
+@dataclass
+class ImageOptions:
+    """Paramètres du prétraitement."""
+    max_dimension: int = 1600
+    jpeg_quality: int = 85
+    crop: bool = True
+    # Écart minimal (0-255) avec la couleur du fond pour qu'un pixel appartienne à la carte.
+    crop_threshold: int = 40
+    # On ne recadre pas si la zone détectée couvre moins de cette fraction de l'image.
+    min_crop_fraction: float = 0.2
+
+
+def detect_mime_type(image_bytes, default="image/jpeg"):
+    """Type MIME d'après les premiers octets du fichier."""
+    for magic, mime in MAGIC_MIME_TYPES:
+        if image_bytes.startswith(magic):
+            return mime
+    return default
+
+
+def card_bbox(image, threshold=40, min_fraction=0.2, margin=0.02):
+    """
+    Boîte (left, top, right, bottom) de la zone qui se détache du fond. La
+    couleur du fond est estimée à partir des bords de l'image ; retourne None
+    si la zone trouvée est trop petite (photo déjà cadrée, fond chargé).
+    """
+    gray = image.convert("L")
+    width, height = gray.size
+    border = [gray.getpixel((x, y)) for x in (0, width - 1) for y in range(0, height, max(1, height // 20))]
+    border += [gray.getpixel((x, y)) for y in (0, height - 1) for x in range(0, width, max(1, width // 20))]
+    background = sorted(border)[len(border) // 2]
+
+    diff = ImageChops.difference(gray, Image.new("L", gray.size, background))
+    mask = diff.filter(ImageFilter.MedianFilter(5)).point(lambda p: 255 if p > threshold else 0)
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    if (right - left) * (bottom - top) < min_fraction * width * height:
+        return None
+    pad_x, pad_y = int(width * margin), int(height * margin)
+    box = (max(0, left - pad_x), max(0, top - pad_y), min(width, right + pad_x), min(height, bottom + pad_y))
+    return None if box == (0, 0, width, height) else box
+
+
+def preprocess_image(image_bytes, options=None):
+    """
+    Retourne (octets, type MIME) prêts pour l'OCR. Si l'image ne peut pas être
+    décodée, les octets d'origine sont renvoyés avec leur type détecté.
+    """
+    options = options or ImageOptions()
+    try:
+        original = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(original)
+    except Exception:
+        return image_bytes, detect_mime_type(image_bytes)
+    # 0x0112 : tag EXIF « Orientation » (1 = image déjà droite).
+    changed = original.getexif().get(0x0112, 1) != 1
+
+    if image.mode != "RGB":
+        # Les PNG transparents sont posés sur fond blanc avant conversion.
+        if "A" in image.getbands():
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    if options.crop:
+        # Détection sur une vignette pour rester rapide sur les photos de plusieurs Mpx.
+        scale = max(1.0, max(image.size) / 400)
+        thumbnail = image.resize((max(1, round(image.width / scale)), max(1, round(image.height / scale))))
+        box = card_bbox(thumbnail, options.crop_threshold, options.min_crop_fraction)
+        if box is not None:
+            image = image.crop(tuple(int(v * scale) for v in box))
+            changed = True
+
+    if max(image.size) > options.max_dimension:
+        image.thumbnail((options.max_dimension, options.max_dimension), Image.LANCZOS)
+        changed = True
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=options.jpeg_quality, optimize=True)
+    processed = output.getvalue()
+    # Une image déjà légère et inchangée peut grossir au réencodage : on garde alors l'original.
+    if not changed and len(processed) >= len(image_bytes):
+        return image_bytes, detect_mime_type(image_bytes)
+    return processed, "image/jpeg"
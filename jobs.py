@@ -0,0 +1,271 @@
+"""
+File de traitement des cartes en arrière-plan.
+
+Le bouton « Envoyer la note » n'exécute plus la chaîne OCR → assistants →
+enregistrement dans le script Streamlit : il ajoute une ligne à la table
+`jobs` et rend la main. Un pool de threads (JobWorkerPool, un par processus)
+prend les jobs en attente, sauvegarde le lead partiel après chaque étape et
+l'enregistre à la fin. Un job en échec (ou interrompu par l'arrêt du
+processus) reprend à l'étape qui suit le dernier checkpoint : le travail
+déjà payé n'est pas refait.
+
+Le pool d'un processus possède tous les jobs « running » de sa base : à son
+démarrage, ceux laissés par un processus arrêté (crash, redéploiement) sont
+remis en file quel que soit leur âge. Un job « running » sans checkpoint
+depuis STALE_AFTER peut aussi être relancé depuis l'interface. Chaque prise
+d'un job incrémente `attempts` : un worker dont le job a été relancé entre-temps
+ne peut plus l'écrire.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, replace
+
+from db import DB_PATH, add_lead, get_connection, transaction
+from metrics import Span
+from pipeline import process_card
+from runs import DEFAULT_DEADLINE
+from tools import DEFAULT_TOOL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Pire durée d'une étape d'assistant : l'échéance du run, qui couvre tous ses tours
+# d'outils (Clients.run_deadline, voir runs.py et chat_backend.py), plus un tour
+# d'outils commencé juste avant elle. Un job « running » sans checkpoint depuis
+# trois fois cette durée (marge pour les attentes 429 de ProviderGate et l'OCR)
+# peut être relancé depuis l'interface sans payer deux fois une étape en cours.
+STAGE_WORST_CASE = DEFAULT_DEADLINE + DEFAULT_TOOL_TIMEOUT
+STALE_AFTER = 3 * STAGE_WORST_CASE
+JOB_COLUMNS = ("id", "status", "stage", "lead_id", "error", "attempts", "created_at", "updated_at")
+STAGES = ("ocr", "agent1", "agent2", "agent3")
+
+
+class JobLostError(Exception):
+    """Le job a été relancé pendant son traitement : ce worker ne le possède plus."""
+
+
+def dump_state(lead):
+    """Lead partiel sérialisé en JSON (sans les RunResult, non sérialisables)."""
+    state = {key: value for key, value in lead.items() if key != "runs"}
+    state["spans"] = [asdict(span) for span in lead.get("spans", [])]
+    return json.dumps(state, ensure_ascii=False)
+
+
+def load_state(text):
+    if not text:
+        return None
+    state = json.loads(text)
+    state["spans"] = [Span(**span) for span in state.get("spans", [])]
+    return state
+
+
+##############################
+# Accès à la table `jobs`    #
+##############################
+def submit_job(conn, image_bytes, qualification, note, owner=None, reuse_enrichment=False):
+    """Ajoute une carte à la file et retourne l'id du job."""
+    now = time.time()
+    with transaction(conn):
+        return conn.execute(
+            "INSERT INTO jobs (owner, image, qualification, note, reuse_enrichment, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (owner, image_bytes, qualification, note, int(reuse_enrichment), now, now)
+        ).lastrowid
+
+
+def claim_job(conn):
+    """
+    Passe le plus ancien job en attente à « running » et le retourne (dict), ou
+    None. `attempt` identifie cette prise du job pour les écritures qui suivent.
+    """
+    with transaction(conn):
+        row = conn.execute(
+            "SELECT id, image, qualification, note, reuse_enrichment, state, attempts FROM jobs "
+            "WHERE status = 'pending' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, error = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), row[0])
+        )
+    return {"id": row[0], "image": row[1], "qualification": row[2], "note": row[3],
+            "reuse_enrichment": bool(row[4]), "state": load_state(row[5]), "attempt": row[6] + 1}
+
+
+def _update_running_job(conn, job_id, attempt, assignments, params):
+    """UPDATE d'un job encore détenu par la prise `attempt` ; lève JobLostError sinon."""
+    updated = conn.execute(
+        f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+        (*params, time.time(), job_id, attempt)
+    ).rowcount
+    if not updated:
+        raise JobLostError(f"Job {job_id} relancé pendant son traitement (prise {attempt})")
+
+
+def save_checkpoint(conn, job_id, attempt, stage, lead):
+    with transaction(conn):
+        _update_running_job(conn, job_id, attempt, "stage = ?, state = ?", (stage, dump_state(lead)))
+
+
+def complete_job(conn, job_id, attempt, lead):
+    """Enregistre le lead et clôt le job dans la même transaction ; l'image n'est plus conservée."""
+    with transaction(conn):
+        _update_running_job(conn, job_id, attempt, "status = 'done', state = ?, image = NULL", (dump_state(lead),))
+        lead_id = add_lead(conn, lead)
+        conn.execute("UPDATE jobs SET lead_id = ? WHERE id = ?", (lead_id, job_id))
+    return lead_id
+
+
+def fail_job(conn, job_id, attempt, error):
+    with transaction(conn):
+        _update_running_job(conn, job_id, attempt, "status = 'failed', error = ?", (error,))
+
+
+def is_stale(job, stale_after=STALE_AFTER):
+    """Job « running » sans checkpoint depuis `stale_after` secondes (worker arrêté ou bloqué)."""
+    return job["status"] == "running" and job["updated_at"] < time.time() - stale_after
+
+
+def retry_job(conn, job_id, stale_after=STALE_AFTER):
+    """
+    Remet dans la file un job en échec, ou « running » sans checkpoint depuis
+    `stale_after` secondes ; il reprendra après son dernier checkpoint.
+    """
+    with transaction(conn):
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', updated_at = ? "
+            "WHERE id = ? AND (status = 'failed' OR (status = 'running' AND updated_at < ?))",
+            (time.time(), job_id, time.time() - stale_after)
+        )
+
+
+def requeue_running_jobs(conn):
+    """
+    Remet en attente tous les jobs « running » ; appelé au démarrage du pool,
+    quand aucun worker de ce processus ne les traite encore. Retourne leur nombre.
+    """
+    with transaction(conn):
+        return conn.execute(
+            "UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'running'", (time.time(),)
+        ).rowcount
+
+
+def _job_filters(owner=None, statuses=None, retryable=False, stale_after=STALE_AFTER):
+    """Clause WHERE et paramètres : propriétaire, statuts, ou jobs à relancer (échec ou sans nouvelle)."""
+    clauses, params = [], []
+    if owner is not None:
+        clauses.append("owner = ?")
+        params.append(owner)
+    if statuses:
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if retryable:
+        clauses.append("(status = 'failed' OR (status = 'running' AND updated_at < ?))")
+        params.append(time.time() - stale_after)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def fetch_jobs(conn, owner=None, statuses=None, retryable=False, limit=20, offset=0):
+    """
+    Jobs (de `owner` s'il est fourni, avec l'un des `statuses`, ou seulement ceux
+    à relancer si `retryable`), du plus récent au plus ancien ; dicts des JOB_COLUMNS.
+    """
+    where, params = _job_filters(owner, statuses, retryable)
+    cursor = conn.execute(
+        f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+        (*params, limit, offset)
+    )
+    return [dict(zip(JOB_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def count_jobs(conn, owner=None, retryable=False):
+    """Nombre de jobs par statut (de `owner` s'il est fourni, ou seulement ceux à relancer)."""
+    where, params = _job_filters(owner, retryable=retryable)
+    return dict(conn.execute(f"SELECT status, COUNT(*) FROM jobs {where} GROUP BY status", params).fetchall())
+
+
+def fetch_job_state(conn, job_id):
+    """Lead (partiel tant que le job n'est pas terminé) sauvegardé pour ce job, ou None."""
+    row = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return load_state(row[0]) if row else None
+
+
+def count_pending_jobs(conn):
+    return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+
+##############################
+# Pool de workers            #
+##############################
+class JobWorkerPool:
+    """
+    Threads qui traitent les jobs de la file avec `clients`. `wake()` évite
+    d'attendre la prochaine scrutation après un `submit_job`. Un seul pool par
+    base : `start()` reprend les jobs « running » de tout processus précédent.
+    """
+
+    def __init__(self, clients, db_path=DB_PATH, workers=DEFAULT_JOB_WORKERS, poll_interval=2.0):
+        self.clients = clients
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        requeued = requeue_running_jobs(get_connection(self.db_path))
+        if requeued:
+            logger.info("%d job(s) interrompu(s) remis en file", requeued)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self):
+        conn = get_connection(self.db_path)
+        while not self._stop.is_set():
+            try:
+                job = claim_job(conn)
+            except Exception:
+                logger.exception("Lecture de la file de jobs en échec")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.run_job(conn, job)
+
+    def run_job(self, conn, job):
+        """Traite un job réclamé par `claim_job`, en reprenant après son dernier checkpoint."""
+        clients = replace(self.clients, reuse_enrichment=job["reuse_enrichment"])
+        try:
+            lead = process_card(
+                clients, job["image"], job["qualification"], job["note"],
+                on_stage=lambda stage, lead: save_checkpoint(conn, job["id"], job["attempt"], stage, lead),
+                checkpoint=job["state"],
+            )
+            lead_id = complete_job(conn, job["id"], job["attempt"], lead)
+            logger.info("Job %d terminé : lead #%d", job["id"], lead_id)
+        except JobLostError as e:
+            logger.warning("%s : résultat abandonné", e)
+        except Exception as e:
+            logger.exception("Job %d en échec", job["id"])
+            try:
+                fail_job(conn, job["id"], job["attempt"], str(e))
+            except JobLostError as lost:
+                logger.warning("%s : échec non enregistré", lost)
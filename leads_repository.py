@@ -0,0 +1,150 @@
+"""
+Requêtes de lecture sur la table `leads` pour la page « Voir les leads ».
+
+La liste est paginée par clé (timestamp, id) — pas d'OFFSET, chaque page
+coûte le même prix quelle que soit sa position — et ne lit que les colonnes
+de synthèse ; les champs longs (OCR, réponses des agents) ne sont chargés
+que pour le lead affiché en détail. Un compteur de version, incrémenté par
+trigger à chaque écriture, sert de clé d'invalidation aux caches de pages.
+La recherche plein texte passe par l'index FTS5 `leads_fts`, tenu à jour par
+triggers. Index, compteur et table FTS sont créés par `migrations.py`.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+SUMMARY_COLUMNS = ("id", "timestamp", "nom", "prenom", "mail", "telephone", "qualification")
+SEARCH_COLUMNS = ("nom", "prenom", "mail", "ocr_text", "note", "agent1", "agent2", "agent3")
+DETAIL_COLUMNS = ("id", "timestamp", "nom", "prenom", "telephone", "mail", "qualification", "note",
+                  "ocr_text", "agent1", "agent2", "agent3", "reused_from")
+DUPLICATE_COLUMNS = ("id", "nom", "prenom", "telephone", "mail", "agent1", "agent2")
+
+
+@dataclass(frozen=True)
+class LeadFilters:
+    """Filtres appliqués en SQL sur la liste des leads."""
+    qualification: str = None
+    date_from: date = None
+    date_to: date = None
+
+    def where(self):
+        """Clause WHERE (sans le mot-clé) et paramètres correspondants."""
+        clauses, params = [], []
+        if self.qualification:
+            clauses.append("qualification = ?")
+            params.append(self.qualification)
+        if self.date_from:
+            clauses.append("timestamp >= ?")
+            params.append(self.date_from.isoformat())
+        if self.date_to:
+            # Borne exclusive au lendemain : `timestamp` contient aussi l'heure.
+            clauses.append("timestamp < ?")
+            params.append((self.date_to + timedelta(days=1)).isoformat())
+        return clauses, params
+
+
+def fts_query(text):
+    """
+    Transforme une saisie libre en requête FTS5 : chaque mot est cité (les
+    caractères spéciaux comme '@' ou '-' ne sont pas interprétés) et le
+    dernier est cherché en préfixe pour la recherche au fil de la frappe.
+    """
+    terms = re.findall(r"\w[\w.@+-]*", text)
+    if not terms:
+        return None
+    quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_leads(conn, text, filters=None, limit=50):
+    """
+    Recherche plein texte classée par pertinence (bm25). Chaque résultat
+    contient les SUMMARY_COLUMNS et un extrait `snippet` surligné en Markdown.
+    """
+    query = fts_query(text)
+    if query is None:
+        return []
+    clauses, params = (filters or LeadFilters()).where()
+    where = "".join(f" AND leads.{clause}" for clause in clauses)
+    columns = ", ".join(f"leads.{c}" for c in SUMMARY_COLUMNS)
+    cursor = conn.execute(
+        f"SELECT {columns}, snippet(leads_fts, -1, '**', '**', ' … ', 12) "
+        f"FROM leads_fts JOIN leads ON leads.id = leads_fts.rowid "
+        f"WHERE leads_fts MATCH ?{where} ORDER BY bm25(leads_fts) LIMIT ?",
+        (query, *params, limit)
+    )
+    return [dict(zip(SUMMARY_COLUMNS + ("snippet",), row)) for row in cursor.fetchall()]
+
+
+def leads_version(conn):
+    """Version courante de la table `leads` (change à chaque écriture)."""
+    row = conn.execute("SELECT version FROM leads_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def fetch_leads_page(conn, filters=None, after=None, page_size=50):
+    """
+    Retourne (lignes, curseur suivant). `after` est le curseur (timestamp, id)
+    du dernier lead de la page précédente ; le curseur suivant vaut None sur
+    la dernière page. Chaque ligne est un dict des SUMMARY_COLUMNS.
+    """
+    clauses, params = (filters or LeadFilters()).where()
+    if after is not None:
+        timestamp, lead_id = after
+        clauses.append("timestamp <= ? AND (timestamp < ? OR id < ?)")
+        params.extend([timestamp, timestamp, lead_id])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = conn.execute(
+        f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM leads {where} "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (*params, page_size + 1)
+    )
+    rows = [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def count_leads(conn, filters=None):
+    clauses, params = (filters or LeadFilters()).where()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(f"SELECT COUNT(*) FROM leads {where}", params).fetchone()[0]
+
+
+def fetch_lead_details(conn, lead_id):
+    """Toutes les colonnes d'un lead, champs longs compris ; None s'il n'existe pas."""
+    row = conn.execute(
+        f"SELECT {', '.join(DETAIL_COLUMNS)} FROM leads WHERE id = ?", (lead_id,)
+    ).fetchone()
+    return dict(zip(DETAIL_COLUMNS, row)) if row else None
+
+
+def fetch_qualifications(conn):
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT qualification FROM leads WHERE qualification IS NOT NULL ORDER BY qualification"
+    )]
+
+
+def find_lead_by_contact(conn, mails=(), phones=()):
+    """
+    Lead le plus récent dont le mail ou le téléphone normalisé figure dans
+    `mails` / `phones` (voir contacts.py) ; dict des DUPLICATE_COLUMNS ou None.
+    """
+    clauses, params = [], []
+    for column, values in (("mail_normalized", mails), ("telephone_normalized", phones)):
+        values = [value for value in values if value]
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    if not clauses:
+        return None
+    row = conn.execute(
+        f"SELECT {', '.join(DUPLICATE_COLUMNS)} FROM leads "
+        f"WHERE ({' OR '.join(clauses)}) AND agent1 IS NOT NULL AND agent2 IS NOT NULL "
+        "ORDER BY timestamp DESC, id DESC LIMIT 1",
+        params
+    ).fetchone()
+    return dict(zip(DUPLICATE_COLUMNS, row)) if row else None
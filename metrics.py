@@ -0,0 +1,79 @@
+"""
+Instrumentation du pipeline : durée, tokens et coût estimé de chaque étape.
+
+`process_card` remplit `lead["spans"]` (OCR, chaque assistant, chaque appel
+d'outil, pipeline complet) ; l'enregistrement du lead y ajoute l'insertion en
+base et persiste le tout dans la table `lead_metrics`, lue par la page
+« Métriques ».
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# Tarifs publics en USD par million de tokens (entrée, sortie), à tenir à jour.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+INSERT_METRIC_SQL = (
+    "INSERT INTO lead_metrics (lead_id, stage, detail, duration, prompt_tokens, completion_tokens, cost) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+METRIC_COLUMNS = ("lead_id", "stage", "detail", "duration", "prompt_tokens", "completion_tokens", "cost",
+                  "created_at")
+
+
+@dataclass
+class Span:
+    """Une étape mesurée ; `detail` précise le mode du run, le nom de l'outil, etc."""
+    stage: str
+    duration: float
+    detail: str = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Coût en USD d'après MODEL_PRICES (0 pour un modèle inconnu)."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+@contextmanager
+def timed(spans, stage, detail=None):
+    """Ajoute à `spans` la durée du bloc, même s'il lève une exception."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append(Span(stage, time.perf_counter() - start, detail))
+
+
+def run_spans(stage, run, duration, model):
+    """
+    Span de l'étape `stage` (durée mesurée autour de l'appel, tokens et coût
+    du run) suivi d'un span « <stage>/tool » par appel d'outil.
+    """
+    usage = run.usage
+    spans = [Span(stage, duration, run.mode, usage["prompt_tokens"], usage["completion_tokens"],
+                  estimate_cost(model, usage["prompt_tokens"], usage["completion_tokens"]))]
+    spans.extend(Span(f"{stage}/tool", timing.duration, timing.name) for timing in run.tool_timings)
+    return spans
+
+
+def metric_rows(lead_id, spans):
+    """Lignes pour INSERT_METRIC_SQL."""
+    return [(lead_id, span.stage, span.detail, span.duration, span.prompt_tokens, span.completion_tokens, span.cost)
+            for span in spans]
+
+
+def fetch_lead_metrics(conn, since=None):
+    """Mesures enregistrées depuis `since` (datetime UTC, ou toutes) ; liste de dicts des METRIC_COLUMNS."""
+    sql = f"SELECT {', '.join(METRIC_COLUMNS)} FROM lead_metrics"
+    params = ()
+    if since is not None:
+        sql += " WHERE created_at >= ?"
+        params = (since.strftime("%Y-%m-%d %H:%M:%S"),)
+    return [dict(zip(METRIC_COLUMNS, row)) for row in conn.execute(sql + " ORDER BY created_at", params)]
@@ -0,0 +1,260 @@
+"""
+Migrations du schéma de `leads.db`.
+
+Le numéro de la dernière migration appliquée est stocké dans
+`PRAGMA user_version`. `migrate()` est appelé une fois au démarrage par
+chaque point d'entrée (application Streamlit, page des leads, mode lot) et
+n'applique que les migrations manquantes, chacune dans sa propre
+transaction : l'affichage d'une page ne fait plus aucun travail de schéma.
+
+Une migration publiée ne se modifie plus : toute évolution du schéma passe
+par une nouvelle fonction ajoutée à la fin de MIGRATIONS. Les premières
+utilisent `IF NOT EXISTS` car elles s'appliquent aussi à des bases créées
+avant ce mécanisme.
+
+    python migrations.py [--db leads.db]
+"""
+import argparse
+import logging
+
+from contacts import normalize_email, normalize_phone
+from db import DB_PATH, connect, transaction
+
+logger = logging.getLogger(__name__)
+
+LEADS_COLUMNS = (
+    ("ocr_text", "TEXT"),
+    ("nom", "TEXT"),
+    ("prenom", "TEXT"),
+    ("telephone", "TEXT"),
+    ("mail", "TEXT"),
+    ("agent1", "TEXT"),
+    ("agent2", "TEXT"),
+    ("agent3", "TEXT"),
+    ("qualification", "TEXT"),
+    ("note", "TEXT"),
+    ("timestamp", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
+)
+
+
+def _execute_all(conn, statements):
+    for statement in statements:
+        conn.execute(statement)
+
+
+##############################
+# Migrations                 #
+##############################
+def create_leads(conn):
+    """
+    Table `leads`. Une ancienne table incomplète est reconstruite en copiant
+    ses lignes : ALTER TABLE ne peut pas ajouter `timestamp` avec sa valeur
+    par défaut CURRENT_TIMESTAMP.
+    """
+    definition = ", ".join(f"{column} {col_type}" for column, col_type in LEADS_COLUMNS)
+    existing = [row[1] for row in conn.execute("PRAGMA table_info(leads)")]
+    if not existing:
+        conn.execute(f"CREATE TABLE leads (id INTEGER PRIMARY KEY AUTOINCREMENT, {definition})")
+        return
+    if all(column in existing for column, _ in LEADS_COLUMNS):
+        return
+    copied = ", ".join(column for column in existing if column == "id" or column in dict(LEADS_COLUMNS))
+    conn.execute(f"CREATE TABLE leads_migration (id INTEGER PRIMARY KEY AUTOINCREMENT, {definition})")
+    conn.execute(f"INSERT INTO leads_migration ({copied}) SELECT {copied} FROM leads")
+    conn.execute("DROP TABLE leads")
+    conn.execute("ALTER TABLE leads_migration RENAME TO leads")
+
+
+def create_leads_indexes(conn):
+    """Index des requêtes de la page des leads et compteur de version maintenu par triggers."""
+    _execute_all(conn, (
+        "CREATE INDEX IF NOT EXISTS idx_leads_timestamp_id ON leads (timestamp DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_leads_qualification_timestamp ON leads (qualification, timestamp DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_leads_mail ON leads (mail)",
+        """CREATE TABLE IF NOT EXISTS leads_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO leads_version (id, version) VALUES (1, 0)",
+        """CREATE TRIGGER IF NOT EXISTS leads_version_insert AFTER INSERT ON leads
+            BEGIN UPDATE leads_version SET version = version + 1 WHERE id = 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS leads_version_update AFTER UPDATE ON leads
+            BEGIN UPDATE leads_version SET version = version + 1 WHERE id = 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS leads_version_delete AFTER DELETE ON leads
+            BEGIN UPDATE leads_version SET version = version + 1 WHERE id = 1; END""",
+    ))
+
+
+def create_leads_search(conn):
+    """
+    Index plein texte `leads_fts` (contenu externe : la table `leads`) et ses
+    triggers de synchronisation ; reconstruit à partir des leads existants.
+    """
+    search_columns = ("nom", "prenom", "mail", "ocr_text", "note", "agent1", "agent2", "agent3")
+    columns = ", ".join(search_columns)
+    new_values = ", ".join(f"new.{c}" for c in search_columns)
+    old_values = ", ".join(f"old.{c}" for c in search_columns)
+    _execute_all(conn, (
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+            {columns}, content='leads', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS leads_fts_insert AFTER INSERT ON leads BEGIN
+            INSERT INTO leads_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS leads_fts_delete AFTER DELETE ON leads BEGIN
+            INSERT INTO leads_fts (leads_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS leads_fts_update AFTER UPDATE ON leads BEGIN
+            INSERT INTO leads_fts (leads_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO leads_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+    ))
+    conn.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+
+
+def create_caches(conn):
+    """Tables des caches OCR et Tavily et registre des assistants OpenAI."""
+    _execute_all(conn, (
+        """CREATE TABLE IF NOT EXISTS ocr_cache (
+            key TEXT PRIMARY KEY,
+            ocr_text TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache (last_access)",
+        """CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            result TEXT NOT NULL,
+            latency REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access)",
+        """CREATE TABLE IF NOT EXISTS assistants (
+            name TEXT NOT NULL,
+            config_hash TEXT NOT NULL,
+            assistant_id TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (name, config_hash)
+        )""",
+    ))
+
+
+def add_contact_keys(conn):
+    """
+    Mail et téléphone normalisés (index de déduplication) et lien vers le
+    lead dont l'enrichissement a été réutilisé ; calculés pour les leads existants.
+    """
+    _execute_all(conn, (
+        "ALTER TABLE leads ADD COLUMN mail_normalized TEXT",
+        "ALTER TABLE leads ADD COLUMN telephone_normalized TEXT",
+        "ALTER TABLE leads ADD COLUMN reused_from INTEGER",
+        "CREATE INDEX idx_leads_mail_normalized ON leads (mail_normalized)",
+        "CREATE INDEX idx_leads_telephone_normalized ON leads (telephone_normalized)",
+    ))
+    rows = conn.execute("SELECT id, mail, telephone FROM leads").fetchall()
+    conn.executemany(
+        "UPDATE leads SET mail_normalized = ?, telephone_normalized = ? WHERE id = ?",
+        [(normalize_email(mail), normalize_phone(telephone), lead_id) for lead_id, mail, telephone in rows]
+    )
+
+
+def create_lead_metrics(conn):
+    """Mesures par étape de chaque lead (durée, tokens, coût estimé), voir metrics.py."""
+    _execute_all(conn, (
+        """CREATE TABLE lead_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lead_id INTEGER NOT NULL,
+            stage TEXT NOT NULL,
+            detail TEXT,
+            duration REAL NOT NULL,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX idx_lead_metrics_lead_id ON lead_metrics (lead_id)",
+        "CREATE INDEX idx_lead_metrics_created_at ON lead_metrics (created_at)",
+    ))
+
+
+def create_jobs(conn):
+    """File des cartes à traiter en arrière-plan, avec le checkpoint de chaque étape (voir jobs.py)."""
+    _execute_all(conn, (
+        """CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            owner TEXT,
+            image BLOB,
+            qualification TEXT,
+            note TEXT,
+            reuse_enrichment INTEGER NOT NULL DEFAULT 0,
+            stage TEXT,
+            state TEXT,
+            lead_id INTEGER,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""",
+        "CREATE INDEX idx_jobs_status_id ON jobs (status, id)",
+        "CREATE INDEX idx_jobs_owner_id ON jobs (owner, id DESC)",
+    ))
+
+
+# La migration N est MIGRATIONS[N - 1].
+MIGRATIONS = (
+    create_leads,
+    create_leads_indexes,
+    create_leads_search,
+    create_caches,
+    add_contact_keys,
+    create_lead_metrics,
+    create_jobs,
+)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Applique les migrations manquantes et retourne la version finale. La
+    version est relue sous verrou d'écriture : deux processus qui démarrent en
+    même temps n'appliquent pas deux fois la même migration.
+    """
+    version = schema_version(conn)
+    if version >= len(MIGRATIONS):
+        return version
+    while True:
+        with transaction(conn):
+            version = schema_version(conn)
+            if version >= len(MIGRATIONS):
+                return version
+            migration = MIGRATIONS[version]
+            logger.info("Migration %d : %s", version + 1, migration.__name__)
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+
+
+def migrate_database(db_path=DB_PATH):
+    """Ouvre `db_path`, applique les migrations et referme la connexion."""
+    conn = connect(db_path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Applique les migrations du schéma de leads.db.")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(f"Schéma de {args.db} en version {migrate_database(args.db)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cache des résultats OCR adressé par contenu.
+
+La clé est le SHA-256 des octets de l'image combiné au nom du modèle OCR et
+aux options de prétraitement (ImageOptions, voir image_preprocessing.py) :
+renvoyer la même carte (après correction de la note ou de la qualification,
+en mode lot ou lors d'un retraitement) ne relance pas l'appel Mistral, mais
+changer `max_dimension` ou le recadrage donne une nouvelle entrée.
+Les entrées expirent après `ttl` secondes et les moins récemment utilisées
+sont évincées au-delà de `max_entries`.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import asdict
+
+from db import DB_PATH, connect, transaction
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def ocr_cache_key(image_bytes, model, options=None):
+    """Clé de cache ; `options` (ImageOptions, ou None sans prétraitement) fait partie de la clé."""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    if options is None:
+        variant = "raw"
+    else:
+        settings = ",".join(f"{name}={value!r}" for name, value in sorted(asdict(options).items()))
+        variant = hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+    return f"{model}:{variant}:{digest}"
+
+
+class OCRCache:
+    """Cache SQLite (table `ocr_cache`) avec TTL, éviction LRU et compteurs hit/miss."""
+
+    def __init__(self, db_path=DB_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = connect(db_path, check_same_thread=False)
+
+    def get(self, image_bytes, model, options=None):
+        """Retourne le texte OCR en cache, ou None (absent ou expiré)."""
+        key = ocr_cache_key(image_bytes, model, options)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT ocr_text, created_at FROM ocr_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE ocr_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, image_bytes, model, ocr_text, options=None):
+        key = ocr_cache_key(image_bytes, model, options)
+        now = time.time()
+        with self._lock, transaction(self.conn):
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, ocr_text, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, ocr_text, now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM ocr_cache WHERE created_at < ?", (now - self.ttl,))
+        self.conn.execute("""
+            DELETE FROM ocr_cache WHERE key IN (
+                SELECT key FROM ocr_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self):
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -1,90 +1,153 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
+import os
+import tempfile
+from db import delete_all_leads, get_connection, insert_lead
+from export import EXPORT_FORMATS, export_leads, pa
+from migrations import migrate_database
+from leads_repository import (
+    SUMMARY_COLUMNS, LeadFilters, count_leads, fetch_lead_details, fetch_leads_page, fetch_qualifications,
+    leads_version, search_leads,
+)
 
 # Configuration de la page Streamlit
 st.set_page_config(page_title="Le charte visite 🐱 - Voir les leads", layout="centered")
 st.title("Le charte visite 🐱 - Voir les leads")
 
-# Connexion à la base de données SQLite
-conn = sqlite3.connect("leads.db", check_same_thread=False)
-cursor = conn.cursor()
-
-# Création de la table 'leads' si elle n'existe pas déjà
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS leads (
-        id INTEGER PRIMARY KEY AUTOINCREMENT
-    )
-""")
-conn.commit()
-
-# Fonction pour ajouter une colonne à une table si elle n'existe pas déjà
-def add_column_if_missing(cursor, table, column, col_type):
-    cursor.execute(f"PRAGMA table_info({table})")
-    columns = [row[1] for row in cursor.fetchall()]
-    if column not in columns:
-        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
-        conn.commit()
-
-# Migration du schéma : ajout des colonnes manquantes dans la table 'leads'
-add_column_if_missing(cursor, "leads", "ocr_text", "TEXT")
-add_column_if_missing(cursor, "leads", "nom", "TEXT")
-add_column_if_missing(cursor, "leads", "prenom", "TEXT")
-add_column_if_missing(cursor, "leads", "telephone", "TEXT")
-add_column_if_missing(cursor, "leads", "mail", "TEXT")
-add_column_if_missing(cursor, "leads", "agent1", "TEXT")
-add_column_if_missing(cursor, "leads", "agent2", "TEXT")
-add_column_if_missing(cursor, "leads", "agent3", "TEXT")
-add_column_if_missing(cursor, "leads", "qualification", "TEXT")
-add_column_if_missing(cursor, "leads", "note", "TEXT")
-add_column_if_missing(cursor, "leads", "timestamp", "DATETIME DEFAULT CURRENT_TIMESTAMP")
+@st.cache_resource
+def init_database():
+    """Applique les migrations du schéma une seule fois par processus."""
+    return migrate_database()
+
+# Schéma à jour (la page peut être ouverte avant l'application principale)
+init_database()
+# Connexion SQLite propre au thread de la session (WAL, busy timeout)
+conn = get_connection()
 
 # Bouton pour ajouter une ligne fictive
 if st.button("Ajouter une ligne fictive"):
-    dummy_data = (
-        "Ceci est un OCR fictif",
-        "Doe",
-        "John",
-        "0123456789",
-        "john.doe@example.com",
-        "Réponse fictive agent1",
-        "Réponse fictive agent2",
-        "Réponse fictive agent3",
-        "Smart Talk",
-        "Ceci est une note fictive"
-    )
-    cursor.execute(
-        "INSERT INTO leads (ocr_text, nom, prenom, telephone, mail, agent1, agent2, agent3, qualification, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        dummy_data
-    )
-    conn.commit()
+    insert_lead(conn, {
+        "ocr_text": "Ceci est un OCR fictif",
+        "nom": "Doe",
+        "prenom": "John",
+        "telephone": "0123456789",
+        "mail": "john.doe@example.com",
+        "agent1": "Réponse fictive agent1",
+        "agent2": "Réponse fictive agent2",
+        "agent3": "Réponse fictive agent3",
+        "qualification": "Smart Talk",
+        "note": "Ceci est une note fictive",
+    })
     st.success("Ligne fictive ajoutée.")
 
 # Bouton pour réinitialiser la base de données (supprime toutes les lignes)
 if st.button("Reset la base de données"):
-    cursor.execute("DELETE FROM leads")
-    conn.commit()
+    delete_all_leads(conn)
     st.success("La base de données a été réinitialisée.")
 
-# Récupération et affichage des données dans un DataFrame
+@st.cache_data(max_entries=200)
+def load_page(version, filters, after, page_size, _conn):
+    """Page de leads en cache ; `version` change à chaque écriture dans la table."""
+    return fetch_leads_page(_conn, filters, after, page_size)
+
+@st.cache_data(max_entries=200)
+def load_count(version, filters, _conn):
+    return count_leads(_conn, filters)
+
+@st.cache_data(max_entries=500)
+def load_details(version, lead_id, _conn):
+    return fetch_lead_details(_conn, lead_id)
+
+@st.cache_data(max_entries=200)
+def load_search(version, text, filters, _conn):
+    return search_leads(_conn, text, filters)
+
+def render_details(rows, version):
+    """Sélecteur de lead ; les champs longs ne sont chargés que pour le lead affiché en détail."""
+    labels = {row["id"]: f"#{row['id']} — {row['prenom'] or ''} {row['nom'] or ''} ({row['timestamp']})" for row in rows}
+    selected_id = st.selectbox("Voir le détail d'un lead", [None] + list(labels),
+                               format_func=lambda lead_id: "—" if lead_id is None else labels[lead_id])
+    if selected_id is not None:
+        lead = load_details(version, selected_id, conn)
+        if lead:
+            st.markdown(f"**Note :** {lead['note'] or ''}")
+            if lead["reused_from"]:
+                st.caption(f"Enrichissement réutilisé du lead #{lead['reused_from']}")
+            for label, column in (("Texte OCR", "ocr_text"), ("Agent 1", "agent1"),
+                                  ("Agent 2", "agent2"), ("Agent 3", "agent3")):
+                with st.expander(label, expanded=column == "agent3"):
+                    st.markdown(lead[column] or "")
+
+# Recherche plein texte et filtres appliqués côté SQL
+search_text = st.text_input("Rechercher", placeholder="Nom, mail, entreprise, mot de la note...")
+col_qualif, col_dates, col_size = st.columns([2, 2, 1])
+qualifications = ["Toutes"] + fetch_qualifications(conn)
+selected_qualification = col_qualif.selectbox("Qualification", qualifications)
+date_range = col_dates.date_input("Période", value=())
+page_size = col_size.selectbox("Par page", [25, 50, 100], index=1)
+
+filters = LeadFilters(
+    qualification=None if selected_qualification == "Toutes" else selected_qualification,
+    date_from=date_range[0] if len(date_range) > 0 else None,
+    date_to=date_range[1] if len(date_range) > 1 else (date_range[0] if len(date_range) == 1 else None),
+)
+
+# Pagination par clé : on garde la pile des curseurs des pages déjà vues
+pagination_key = (filters, page_size)
+if st.session_state.get("leads_pagination_key") != pagination_key:
+    st.session_state["leads_pagination_key"] = pagination_key
+    st.session_state["leads_cursors"] = [None]
+cursors = st.session_state["leads_cursors"]
+
 try:
-    cursor.execute("""
-        SELECT id, ocr_text, nom, prenom, telephone, mail, 
-               agent1, agent2, agent3, qualification, note, timestamp 
-        FROM leads 
-        ORDER BY timestamp DESC
-    """)
-    rows = cursor.fetchall()
-    
-    if rows:
-        # Récupération du nom des colonnes
-        columns = [description[0] for description in cursor.description]
-        df = pd.DataFrame(rows, columns=columns)
-        st.dataframe(df)
+    version = leads_version(conn)
+    if search_text.strip():
+        results = load_search(version, search_text, filters, conn)
+        if results:
+            st.caption(f"{len(results)} résultat(s), classés par pertinence")
+            for row in results:
+                st.markdown(
+                    f"**#{row['id']} — {row['prenom'] or ''} {row['nom'] or ''}** "
+                    f"({row['mail'] or 'sans mail'}, {row['timestamp']})  \n{row['snippet']}"
+                )
+            render_details(results, version)
+        else:
+            st.info("Aucun lead ne correspond à cette recherche.")
     else:
-        st.info("Aucun lead n'a été enregistré pour le moment.")
+        rows, next_cursor = load_page(version, filters, cursors[-1], page_size, conn)
+        total = load_count(version, filters, conn)
+
+        if rows:
+            st.caption(f"{total} lead(s) — page {len(cursors)}")
+            st.dataframe(pd.DataFrame(rows, columns=SUMMARY_COLUMNS), hide_index=True)
+
+            col_prev, col_next = st.columns(2)
+            if col_prev.button("← Précédent", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if col_next.button("Suivant →", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+
+            render_details(rows, version)
+        else:
+            st.info("Aucun lead n'a été enregistré pour le moment.")
 except Exception as e:
     st.error("Erreur lors de la récupération des leads : " + str(e))
 
-# Fermeture de la connexion à la base de données
-conn.close()
+# Export des leads filtrés (période, qualification), écrit par paquets dans un fichier temporaire
+st.subheader("Export")
+col_format, col_export = st.columns([2, 1])
+export_formats = [f for f in EXPORT_FORMATS if f != "parquet" or pa is not None]
+export_format = col_format.selectbox("Format", export_formats,
+                                     format_func={"csv": "CSV", "parquet": "Parquet", "vcard": "vCard (.vcf)"}.get)
+if col_export.button("Préparer l'export"):
+    _, mime_type, extension = EXPORT_FORMATS[export_format]
+    fd, path = tempfile.mkstemp(suffix=f".{extension}")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            count = export_leads(conn, export_format, out, filters)
+        with open(path, "rb") as f:
+            st.download_button(f"Télécharger {count} lead(s)", f, file_name=f"leads.{extension}", mime=mime_type)
+    finally:
+        os.remove(path)
@@ -0,0 +1,90 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from db import get_connection
+from metrics import METRIC_COLUMNS, fetch_lead_metrics
+from migrations import migrate_database
+
+# Configuration de la page Streamlit
+st.set_page_config(page_title="Le charte visite 🐱 - Métriques", layout="centered")
+st.title("Le charte visite 🐱 - Métriques")
+
+@st.cache_resource
+def init_database():
+    """Applique les migrations du schéma une seule fois par processus."""
+    return migrate_database()
+
+init_database()
+conn = get_connection()
+
+PERIODS = {"24 heures": timedelta(days=1), "7 jours": timedelta(days=7), "30 jours": timedelta(days=30), "Tout": None}
+STAGE_ORDER = ["pipeline", "ocr", "dedup_lookup", "agent1", "agent1/tool", "agent2", "agent2/tool",
+               "agent3", "agent3/tool", "db_insert"]
+
+col_period, col_bucket = st.columns(2)
+period = col_period.selectbox("Période", list(PERIODS), index=1)
+bucket = col_bucket.selectbox("Débit par", ["heure", "jour"])
+
+# `created_at` est en UTC (CURRENT_TIMESTAMP de SQLite)
+since = None
+if PERIODS[period] is not None:
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - PERIODS[period]
+metrics = pd.DataFrame(fetch_lead_metrics(conn, since), columns=METRIC_COLUMNS)
+
+if metrics.empty:
+    st.info("Aucune mesure sur cette période : elles sont enregistrées avec chaque nouveau lead.")
+    st.stop()
+
+metrics["created_at"] = pd.to_datetime(metrics["created_at"])
+leads = metrics.groupby("lead_id").agg(
+    created_at=("created_at", "min"),
+    prompt_tokens=("prompt_tokens", "sum"),
+    completion_tokens=("completion_tokens", "sum"),
+    cost=("cost", "sum"),
+)
+leads["tokens"] = leads["prompt_tokens"] + leads["completion_tokens"]
+pipeline = metrics.loc[metrics["stage"] == "pipeline", "duration"]
+
+col_leads, col_p50, col_p95, col_cost = st.columns(4)
+col_leads.metric("Leads", len(leads))
+col_p50.metric("Durée p50", f"{pipeline.quantile(0.5):.1f}s" if len(pipeline) else "—")
+col_p95.metric("Durée p95", f"{pipeline.quantile(0.95):.1f}s" if len(pipeline) else "—")
+col_cost.metric("Coût moyen", f"${leads['cost'].mean():.3f}")
+
+# Latence par étape
+st.subheader("Latence par étape")
+stages = metrics.groupby("stage")["duration"].agg(
+    mesures="count",
+    p50=lambda d: d.quantile(0.5),
+    p95=lambda d: d.quantile(0.95),
+    max="max",
+)
+stages = stages.reindex([s for s in STAGE_ORDER if s in stages.index]
+                        + sorted(set(stages.index) - set(STAGE_ORDER)))
+st.dataframe(stages.style.format({"p50": "{:.2f}s", "p95": "{:.2f}s", "max": "{:.2f}s"}))
+st.bar_chart(stages[["p50", "p95"]])
+
+# Détail des outils (ex. tavily_search) et des modes de run
+details = metrics.dropna(subset=["detail"]).groupby(["stage", "detail"])["duration"].agg(
+    mesures="count", p50=lambda d: d.quantile(0.5), p95=lambda d: d.quantile(0.95)
+)
+if not details.empty:
+    with st.expander("Détail par outil / mode de run"):
+        st.dataframe(details.style.format({"p50": "{:.2f}s", "p95": "{:.2f}s"}))
+
+# Tokens par lead
+st.subheader("Tokens par lead")
+col_mean, col_p50_tokens, col_p95_tokens = st.columns(3)
+col_mean.metric("Moyenne", f"{leads['tokens'].mean():,.0f}")
+col_p50_tokens.metric("p50", f"{leads['tokens'].quantile(0.5):,.0f}")
+col_p95_tokens.metric("p95", f"{leads['tokens'].quantile(0.95):,.0f}")
+tokens_by_stage = metrics[metrics["prompt_tokens"] + metrics["completion_tokens"] > 0].groupby("stage")[
+    ["prompt_tokens", "completion_tokens"]
+].sum() / len(leads)
+st.bar_chart(tokens_by_stage)
+
+# Débit dans le temps
+st.subheader("Débit")
+frequency = "h" if bucket == "heure" else "D"
+throughput = leads.set_index("created_at").resample(frequency).size().rename("leads")
+st.line_chart(throughput)
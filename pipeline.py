@@ -0,0 +1,419 @@
+"""
+Pipeline de traitement d'une carte de visite : OCR Mistral, puis chaîne des
+trois assistants (extraction & recherche, matching produits, mail de relance).
+
+Les fonctions reçoivent leurs clients via un objet `Clients`, ce qui permet de
+les utiliser aussi bien depuis l'application Streamlit que depuis le mode lot.
+"""
+import base64
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+from assistants import AGENT1_FIELDS, ASSISTANT_SPECS
+from chat_backend import run_chat_agent
+from contacts import find_contacts, normalize_email, personal_emails
+from db import get_connection
+from image_preprocessing import ImageOptions, detect_mime_type, preprocess_image
+from leads_repository import find_lead_by_contact
+from metrics import run_spans, timed
+from runs import DEFAULT_DEADLINE, DEFAULT_MAX_TOOL_ROUNDS, direct_request, execute_run
+from tools import ToolRegistry
+
+OCR_MODEL = "mistral-ocr-latest"
+TAVILY_SEARCH_PARAMS = {"search_depth": "advanced", "max_tokens": 8000}
+DEFAULT_BACKEND = os.getenv("AGENT_BACKEND", "threads")
+
+
+class NoTextError(Exception):
+    """L'OCR n'a extrait aucun texte exploitable de la carte."""
+
+
+@dataclass
+class Clients:
+    """
+    Clients externes et identifiants d'assistants utilisés par le pipeline.
+    `gate`, s'il est fourni, encadre chaque appel externe (limites de
+    concurrence par fournisseur, retries) via `gate.call(provider, fn, ...)`.
+    `ocr_cache`, s'il est fourni, évite de relancer l'OCR sur une image déjà traitée,
+    et `search_cache` de relancer une recherche Tavily identique. `tools` est le
+    ToolRegistry exposé aux assistants (par défaut : `tavily_search`) ; un run
+    d'assistant est limité à `max_tool_rounds` tours d'outils et `run_deadline` secondes.
+    `image_options` règle le prétraitement des photos avant l'OCR (None le désactive).
+    `structured_output` fait répondre l'assistant 1 en JSON et ne transmet aux
+    assistants 2 et 3 que les champs dont ils ont besoin. `backend` choisit
+    l'exécution des assistants : "threads" (API Assistants) ou "chat" (Chat Completions).
+    `leads_db`, s'il est fourni, est la base où chercher un lead déjà connu (même
+    mail personnel) dont l'enrichissement est réutilisé si `reuse_enrichment`
+    (désactivé par défaut : l'utilisateur le choisit).
+    """
+    openai: object
+    mistral: object
+    tavily: object
+    assistant_ids: dict = field(default_factory=dict)
+    gate: object = None
+    ocr_cache: object = None
+    search_cache: object = None
+    tools: object = None
+    max_tool_rounds: int = DEFAULT_MAX_TOOL_ROUNDS
+    run_deadline: float = DEFAULT_DEADLINE
+    image_options: object = field(default_factory=ImageOptions)
+    structured_output: bool = True
+    backend: str = DEFAULT_BACKEND
+    leads_db: str = None
+    reuse_enrichment: bool = False
+
+    def call(self, provider, fn, *args, **kwargs):
+        if self.gate is None:
+            return fn(*args, **kwargs)
+        return self.gate.call(provider, fn, *args, **kwargs)
+
+    def openai_request(self, fn, *args, **kwargs):
+        """Une requête HTTP OpenAI, encadrée par `gate` (et non un assistant entier)."""
+        return self.call("openai", fn, *args, **kwargs)
+
+
+##############################
+# Fonctions utilitaires      #
+##############################
+def clean_response(response):
+    """Nettoie la réponse en supprimant les tags HTML et convertit '\\n' en retours à la ligne."""
+    match = re.search(r'value="(.*?)"\)', response, re.DOTALL)
+    cleaned = match.group(1) if match else response
+    cleaned = re.sub(r'<[^>]+>', '', cleaned)
+    return cleaned.replace("\\n", "\n").strip()
+
+def extract_text_from_ocr_response(ocr_response):
+    """Extrait le texte OCR en ignorant les balises image."""
+    extracted_text = ""
+    pages = ocr_response.pages if hasattr(ocr_response, "pages") else (ocr_response if isinstance(ocr_response, list) else [])
+    for page in pages:
+        if hasattr(page, "markdown") and page.markdown:
+            lines = page.markdown.split("\n")
+            filtered = [line.strip() for line in lines if not line.startswith("![")]
+            if filtered:
+                extracted_text += "\n".join(filtered) + "\n"
+    return extracted_text.strip()
+
+def image_to_data_uri(image_bytes, mime_type="image/jpeg"):
+    """Encode l'image en data URI base64 pour l'OCR."""
+    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    return f"data:{mime_type};base64,{base64_image}"
+
+def tavily_search(clients, query):
+    """Effectue une recherche en ligne via Tavily (ou depuis le cache)."""
+    def fetch():
+        return clients.call("tavily", clients.tavily.get_search_context, query, **TAVILY_SEARCH_PARAMS)
+    if clients.search_cache is None:
+        return fetch()
+    return clients.search_cache.get_or_fetch(query, fetch, **TAVILY_SEARCH_PARAMS)
+
+def default_tool_registry(clients):
+    """Registre des outils disponibles pour les assistants."""
+    registry = ToolRegistry()
+    registry.register("tavily_search", lambda query: tavily_search(clients, query))
+    return registry
+
+def get_final_assistant_message(client, thread_id, request=direct_request):
+    """Récupère le dernier message de l'assistant dans un thread."""
+    messages = request(client.beta.threads.messages.list, thread_id=thread_id)
+    final_msg = ""
+    for msg in messages:
+        if msg.role == "assistant":
+            for content in msg.content:
+                if isinstance(content, dict):
+                    final_msg += content.get("text", "")
+                elif hasattr(getattr(content, "text", None), "value"):
+                    final_msg += content.text.value
+                else:
+                    final_msg += str(content)
+    return final_msg.strip()
+
+def parse_agent1_response(text):
+    """
+    Extrait Nom, Prénom, Téléphone et Mail à partir de la réponse de l'assistant 1.
+    La réponse doit contenir des lignes telles que :
+      Nom: Doe
+      Prénom: John
+      Téléphone: 0123456789
+      Mail: john.doe@example.com
+    """
+    data = {"nom": "", "prenom": "", "telephone": "", "mail": ""}
+    nom = re.search(r"Nom\s*:\s*(.+)", text)
+    prenom = re.search(r"Pr[ée]nom\s*:\s*(.+)", text)
+    tel = re.search(r"T[eé]l[eé]phone?\s*:\s*(.+)", text, re.IGNORECASE)
+    mail = re.search(r"Mail\s*:\s*(.+)", text, re.IGNORECASE)
+    if nom:
+        data["nom"] = nom.group(1).strip()
+    if prenom:
+        data["prenom"] = prenom.group(1).strip()
+    if tel:
+        data["telephone"] = tel.group(1).strip()
+    if mail:
+        data["mail"] = mail.group(1).strip()
+    return data
+
+def parse_agent1_json(text):
+    """
+    Lit la réponse JSON de l'assistant 1 en mode structuré. Si la réponse
+    n'est pas un JSON valide, on se rabat sur parse_agent1_response.
+    """
+    data = dict.fromkeys(AGENT1_FIELDS, "")
+    try:
+        parsed = json.loads(text, strict=False)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict):
+        data.update({k: str(parsed.get(k) or "").strip() for k in AGENT1_FIELDS})
+    else:
+        data.update(parse_agent1_response(text))
+        data["resume"] = text
+    return data
+
+def format_agent1_fields(data):
+    """Version lisible des champs structurés, stockée dans la colonne `agent1`."""
+    return (
+        f"Nom: {data['nom']}\n"
+        f"Prénom: {data['prenom']}\n"
+        f"Téléphone: {data['telephone']}\n"
+        f"Mail: {data['mail']}\n"
+        f"Entreprise: {data['entreprise']}\n\n"
+        f"{data['resume']}"
+    )
+
+##############################
+# Messages des assistants    #
+##############################
+def agent1_message(ocr_text, qualification, note):
+    return (
+        f"Données extraites de la carte :\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n"
+        f"Texte : {ocr_text}\n\n"
+        "Veuillez extraire les informations clés (Nom, Prénom, Téléphone, Mail) "
+        "et compléter par une recherche en ligne."
+    )
+
+def agent2_message(response_agent1, qualification, note):
+    return (
+        f"Informations sur l'entreprise extraites :\n{response_agent1}\n\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n\n"
+        "Veuillez rédiger un matching entre nos produits et les besoins du client, "
+        "en mettant en avant les avantages de nos offres."
+    )
+
+def agent3_message(response_agent1, response_agent2, qualification, note):
+    return (
+        f"Informations sur l'intervenant et son entreprise :\n{response_agent1}\n\n"
+        f"Matching de notre offre :\n{response_agent2}\n\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n\n"
+        "Veuillez rédiger un mail de relance percutant pour convertir ce lead. "
+        "Le mail doit commencer par 'Bonjour [prénom]' et se terminer par 'Cordialement Emeline Boulange Co-dirigeante de Nin-IA'."
+    )
+
+def agent1_structured_message(ocr_text, qualification, note):
+    return (
+        f"Données extraites de la carte :\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n"
+        f"Texte : {ocr_text}\n\n"
+        "Veuillez extraire les informations clés, les compléter par une recherche en ligne "
+        "et répondre au format JSON demandé."
+    )
+
+def agent2_compact_message(data, qualification, note):
+    """Message de l'assistant 2 en mode structuré : seulement l'entreprise et le résumé."""
+    return (
+        f"Entreprise : {data['entreprise']}\n"
+        f"Profil du client : {data['resume']}\n\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n\n"
+        "Veuillez rédiger un matching entre nos produits et les besoins du client, "
+        "en mettant en avant les avantages de nos offres."
+    )
+
+def agent3_compact_message(data, response_agent2, qualification, note):
+    """Message de l'assistant 3 en mode structuré : identité, résumé et matching."""
+    return (
+        f"Intervenant : {data['prenom']} {data['nom']}, {data['entreprise']}\n"
+        f"Profil : {data['resume']}\n\n"
+        f"Matching de notre offre :\n{response_agent2}\n\n"
+        f"Qualification : {qualification}\n"
+        f"Note : {note}\n\n"
+        "Veuillez rédiger un mail de relance percutant pour convertir ce lead. "
+        "Le mail doit commencer par 'Bonjour [prénom]' et se terminer par 'Cordialement Emeline Boulange Co-dirigeante de Nin-IA'."
+    )
+
+##############################
+# Étapes du pipeline         #
+##############################
+def run_ocr(clients, image_bytes):
+    """Extraction OCR via Mistral (ou depuis le cache) ; lève NoTextError si aucun texte n'est extrait."""
+    if clients.ocr_cache is not None:
+        ocr_text = clients.ocr_cache.get(image_bytes, OCR_MODEL, clients.image_options)
+        if ocr_text:
+            return ocr_text
+    if clients.image_options is not None:
+        payload, mime_type = preprocess_image(image_bytes, clients.image_options)
+    else:
+        payload, mime_type = image_bytes, detect_mime_type(image_bytes)
+    ocr_response = clients.call(
+        "mistral", clients.mistral.ocr.process,
+        model=OCR_MODEL,
+        document={"type": "image_url", "image_url": image_to_data_uri(payload, mime_type)}
+    )
+    ocr_text = extract_text_from_ocr_response(ocr_response)
+    if not ocr_text:
+        raise NoTextError("Aucun texte exploitable n'a été extrait.")
+    if clients.ocr_cache is not None:
+        clients.ocr_cache.put(image_bytes, OCR_MODEL, ocr_text, clients.image_options)
+    return ocr_text
+
+def _run_threads_agent(clients, assistant_key, user_message, clean=True):
+    """Backend « threads » : API Assistants (thread, message, run, lecture du message)."""
+    client = clients.openai
+    tools = clients.tools if clients.tools is not None else default_tool_registry(clients)
+    tool_timings = []
+    request = clients.openai_request
+    thread = request(client.beta.threads.create)
+    request(client.beta.threads.messages.create, thread_id=thread.id, role="user", content=user_message)
+    run = execute_run(
+        client, thread.id, clients.assistant_ids[assistant_key],
+        tool_handler=tools.handler(tool_timings), max_tool_rounds=clients.max_tool_rounds,
+        deadline=clients.run_deadline, request=request
+    )
+    run.tool_timings = tool_timings
+    if run.status != "completed":
+        raise RuntimeError(f"Assistant '{assistant_key}' : run terminé avec le statut '{run.status}'")
+    response = get_final_assistant_message(client, thread.id, request)
+    return (clean_response(response) if clean else response), run
+
+def _run_chat_agent(clients, assistant_key, user_message, clean=True):
+    """Backend « chat » : une requête Chat Completions en streaming par tour d'outils."""
+    tools = clients.tools if clients.tools is not None else default_tool_registry(clients)
+    tool_timings = []
+    response, run = run_chat_agent(
+        clients.openai, assistant_key, user_message,
+        tool_handler=tools.handler(tool_timings), max_tool_rounds=clients.max_tool_rounds,
+        request=clients.openai_request, deadline=clients.run_deadline
+    )
+    run.tool_timings = tool_timings
+    if run.status != "completed":
+        raise RuntimeError(f"Assistant '{assistant_key}' : réponse terminée avec le statut '{run.status}'")
+    return (clean_response(response) if clean else response), run
+
+AGENT_BACKENDS = {
+    "threads": _run_threads_agent,
+    "chat": _run_chat_agent,
+}
+
+def run_agent(clients, assistant_key, user_message, clean=True):
+    """
+    Exécute un assistant avec le backend configuré ; retourne (réponse nettoyée, RunResult).
+    Limites et retries de `clients.gate` s'appliquent à chaque requête OpenAI
+    (voir Clients.openai_request) : un 429 ne relance jamais l'assistant entier.
+    """
+    backend = AGENT_BACKENDS[clients.backend]
+    return backend(clients, assistant_key, user_message, clean)
+
+def run_stage(clients, lead, stage, assistant_key, user_message, clean=True):
+    """Exécute l'assistant de l'étape `stage` ; son RunResult et ses spans sont ajoutés au lead."""
+    start = time.perf_counter()
+    response, run = run_agent(clients, assistant_key, user_message, clean)
+    lead["runs"][stage] = run
+    lead["spans"].extend(run_spans(stage, run, time.perf_counter() - start, ASSISTANT_SPECS[assistant_key]["model"]))
+    return response
+
+def find_existing_lead(clients, lead, mails):
+    """Lead déjà enregistré avec l'un de ces mails normalisés, ou None."""
+    if clients.leads_db is None or not clients.reuse_enrichment:
+        return None
+    with timed(lead["spans"], "dedup_lookup"):
+        return find_lead_by_contact(get_connection(clients.leads_db), mails=mails)
+
+def reuse_enrichment(lead, existing, on_stage):
+    """Reprend l'identité et les réponses des assistants 1 et 2 d'un lead connu ; seul le mail sera régénéré."""
+    lead.update({key: existing[key] for key in ("nom", "prenom", "telephone", "mail", "agent1", "agent2")})
+    lead["reused_from"] = existing["id"]
+    on_stage("agent1", lead)
+    on_stage("agent2", lead)
+
+def process_card(clients, image_bytes, qualification, note, on_stage=None, checkpoint=None):
+    """
+    Enchaîne OCR et assistants 1 à 3 pour une carte et retourne le lead.
+    `on_stage(stage, lead)` est appelé après chaque étape ("ocr", "agent1",
+    "agent2", "agent3") pour un affichage progressif ou une sauvegarde.
+    `checkpoint`, un lead partiel sauvegardé après une étape, fait reprendre
+    le traitement à l'étape suivante (voir jobs.py).
+
+    Contact déjà connu : si la carte porte un seul mail personnel et qu'il
+    correspond à un lead existant, les assistants 1 et 2 ne sont pas relancés ;
+    sinon, un lead du mail personnel extrait par l'assistant 1 évite
+    l'assistant 2. Ni le téléphone ni les boîtes partagées (contact@, info@...)
+    ne servent à la recherche : un standard ou une boîte d'entreprise désigne
+    plusieurs personnes, dont l'enrichissement serait recopié. `lead["reused_from"]`
+    indique alors le lead repris et `lead["runs"]` n'a pas d'entrée pour les
+    étapes réutilisées (ni pour celles reprises d'un checkpoint).
+
+    `lead["spans"]` reçoit la durée (et les tokens) de chaque étape, de
+    chaque appel d'outil et du pipeline complet (voir metrics.py).
+    """
+    on_stage = on_stage or (lambda stage, lead: None)
+    lead = {"runs": {}, "spans": [], **(checkpoint or {})}
+    lead.update(qualification=qualification, note=note)
+    with timed(lead["spans"], "pipeline"):
+        return _process_card(clients, lead, image_bytes, qualification, note, on_stage)
+
+def _process_card(clients, lead, image_bytes, qualification, note, on_stage):
+    if "ocr_text" not in lead:
+        with timed(lead["spans"], "ocr"):
+            lead["ocr_text"] = run_ocr(clients, image_bytes)
+        on_stage("ocr", lead)
+
+    if "agent1" not in lead:
+        mails = personal_emails(find_contacts(lead["ocr_text"])[0])
+        existing = find_existing_lead(clients, lead, mails=mails) if len(mails) == 1 else None
+        if existing:
+            reuse_enrichment(lead, existing, on_stage)
+        elif clients.structured_output:
+            # Sortie JSON de l'assistant 1 : les assistants 2 et 3 ne reçoivent que les champs utiles.
+            response = run_stage(
+                clients, lead, "agent1", "extraction_structured",
+                agent1_structured_message(lead["ocr_text"], qualification, note), clean=False
+            )
+            data = parse_agent1_json(response)
+            lead["agent1"] = format_agent1_fields(data)
+            lead.update(data)
+            on_stage("agent1", lead)
+        else:
+            lead["agent1"] = run_stage(
+                clients, lead, "agent1", "extraction", agent1_message(lead["ocr_text"], qualification, note)
+            )
+            lead.update(parse_agent1_response(lead["agent1"]))
+            on_stage("agent1", lead)
+
+    # Mode structuré : champs JSON de l'assistant 1 (absents si son résultat a été réutilisé)
+    structured = clients.structured_output and "resume" in lead
+    data = {key: lead.get(key, "") for key in AGENT1_FIELDS}
+
+    if "agent2" not in lead:
+        existing = find_existing_lead(clients, lead, mails=personal_emails([normalize_email(lead["mail"])]))
+        if existing:
+            lead["agent2"], lead["reused_from"] = existing["agent2"], existing["id"]
+        elif structured:
+            lead["agent2"] = run_stage(clients, lead, "agent2", "product", agent2_compact_message(data, qualification, note))
+        else:
+            lead["agent2"] = run_stage(clients, lead, "agent2", "product", agent2_message(lead["agent1"], qualification, note))
+        on_stage("agent2", lead)
+
+    if structured:
+        agent3_request = agent3_compact_message(data, lead["agent2"], qualification, note)
+    else:
+        agent3_request = agent3_message(lead["agent1"], lead["agent2"], qualification, note)
+    lead["agent3"] = run_stage(clients, lead, "agent3", "email", agent3_request)
+    on_stage("agent3", lead)
+    return lead
@@ -0,0 +1,269 @@
+"""
+Moteur d'exécution des runs d'assistants OpenAI.
+
+Le run est lancé en streaming : les appels d'outils (`requires_action`) sont
+traités dès que l'événement arrive, sans attendre un cycle de polling. Si le
+streaming n'est pas disponible, on se rabat sur un polling à intervalle
+exponentiel. Dans les deux modes, `deadline` borne le run entier (tours
+d'outils compris) : à l'échéance, le run est annulé côté OpenAI et
+RunTimeoutError est levée, même si le flux d'événements reste muet.
+
+Chaque requête HTTP (création, suivi, soumission des sorties d'outils,
+annulation) passe par `request(fn, *args, **kwargs)` s'il est fourni : c'est
+là que s'appliquent limites de concurrence et retries (voir batch.ProviderGate),
+requête par requête, jamais autour du run entier.
+"""
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled", "incomplete")
+# Événements de fin du run lui-même ; `thread.run.step.completed` (étape d'outils
+# ou de message) arrive avant la réponse de l'assistant et ne termine pas le run.
+TERMINAL_RUN_EVENTS = tuple(f"thread.run.{status}" for status in TERMINAL_STATUSES)
+DEFAULT_DEADLINE = 180.0
+DEFAULT_MAX_TOOL_ROUNDS = 5
+
+
+class RunTimeoutError(Exception):
+    """Le run n'a pas atteint d'état terminal avant l'échéance."""
+
+
+class StreamingUnavailableError(Exception):
+    """Le SDK installé ne permet pas de lancer un run en streaming."""
+
+
+class ToolRoundsExceededError(Exception):
+    """L'assistant a demandé plus de tours d'outils que `max_tool_rounds` ; le run a été annulé."""
+
+
+@dataclass
+class RunResult:
+    """Résultat d'un run : objet run final, mode utilisé et latence mesurée."""
+    run: object
+    mode: str
+    latency: float
+    tool_rounds: int = 0
+    events: list = field(default_factory=list)
+    tool_timings: list = field(default_factory=list)
+
+    @property
+    def status(self):
+        return self.run.status
+
+    @property
+    def usage(self):
+        """Tokens consommés par le run, tels que rapportés par l'API."""
+        usage = getattr(self.run, "usage", None)
+        return {
+            key: getattr(usage, key, 0) or 0
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+
+
+def direct_request(fn, *args, **kwargs):
+    """`request` par défaut : appel direct, sans limite ni retry."""
+    return fn(*args, **kwargs)
+
+
+# Latences des derniers runs, consultables depuis l'interface.
+run_latencies = []
+
+
+def record_run(result):
+    run_latencies.append(result.latency)
+    del run_latencies[:-100]
+    logger.info("Run %s (%s) terminé en %.2fs, statut %s", result.run.id, result.mode, result.latency, result.status)
+    return result
+
+
+##############################
+# Polling adaptatif          #
+##############################
+def wait_for_run_completion(client, thread_id, run_id, deadline=DEFAULT_DEADLINE,
+                            initial_delay=0.2, max_delay=2.0, backoff=1.5, request=direct_request):
+    """
+    Attend qu'un run atteigne un état terminal ou `requires_action`.
+    Le délai entre deux `runs.retrieve` croît de façon exponentielle, de
+    `initial_delay` jusqu'à `max_delay` ; lève RunTimeoutError après `deadline` secondes.
+    """
+    expires_at = time.monotonic() + deadline
+    delay = initial_delay
+    while True:
+        run = request(client.beta.threads.runs.retrieve, thread_id=thread_id, run_id=run_id)
+        if run.status in TERMINAL_STATUSES or run.status == "requires_action":
+            return run
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            raise RunTimeoutError(f"Run {run_id} toujours '{run.status}' après {deadline}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_delay)
+
+
+def iter_with_deadline(stream, expires_at, description="Flux"):
+    """
+    Itère sur `stream` (événements ou chunks) jusqu'à `expires_at` (time.monotonic()).
+    Le flux est lu dans un thread : un flux muet lève RunTimeoutError à
+    l'échéance au lieu de bloquer la lecture. Le flux est alors fermé s'il le permet.
+    """
+    items = queue.Queue()
+    end = object()
+
+    def read():
+        try:
+            for item in stream:
+                items.put((item, None))
+        except Exception as e:
+            items.put((end, e))
+        else:
+            items.put((end, None))
+
+    threading.Thread(target=read, name="stream-reader", daemon=True).start()
+    while True:
+        try:
+            item, error = items.get(timeout=max(0.0, expires_at - time.monotonic()))
+        except queue.Empty:
+            try:
+                stream.close()
+            except Exception:
+                # Pas de close(), ou générateur en cours de lecture : le thread de lecture est abandonné.
+                pass
+            raise RunTimeoutError(f"{description} : aucune fin avant l'échéance") from None
+        if error is not None:
+            raise error
+        if item is end:
+            return
+        yield item
+
+
+def _cancel_run(client, thread_id, run_id, request):
+    """Annule un run abandonné (échéance dépassée) ; un échec est seulement journalisé."""
+    try:
+        request(client.beta.threads.runs.cancel, thread_id=thread_id, run_id=run_id)
+    except Exception:
+        logger.warning("Annulation du run %s en échec", run_id, exc_info=True)
+
+
+def _check_tool_rounds(client, thread_id, run_id, tool_rounds, max_tool_rounds, request):
+    if tool_rounds > max_tool_rounds:
+        request(client.beta.threads.runs.cancel, thread_id=thread_id, run_id=run_id)
+        raise ToolRoundsExceededError(f"Run {run_id} : plus de {max_tool_rounds} tours d'outils")
+
+
+def _poll_run(client, thread_id, assistant_id, tool_handler, deadline, max_tool_rounds, request):
+    expires_at = time.monotonic() + deadline
+    run = request(client.beta.threads.runs.create, thread_id=thread_id, assistant_id=assistant_id)
+    try:
+        run = wait_for_run_completion(client, thread_id, run.id, deadline=deadline, request=request)
+        tool_rounds = 0
+        while run.status == "requires_action":
+            tool_rounds += 1
+            _check_tool_rounds(client, thread_id, run.id, tool_rounds, max_tool_rounds, request)
+            tool_outputs = tool_handler(run.required_action.submit_tool_outputs.tool_calls)
+            run = request(
+                client.beta.threads.runs.submit_tool_outputs,
+                thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+            )
+            run = wait_for_run_completion(
+                client, thread_id, run.id, deadline=max(0.0, expires_at - time.monotonic()), request=request
+            )
+    except RunTimeoutError:
+        _cancel_run(client, thread_id, run.id, request)
+        raise
+    return run, tool_rounds
+
+
+##############################
+# Streaming                  #
+##############################
+class RunEventHandler:
+    """
+    Consomme les événements d'un run en streaming. Les `requires_action` sont
+    résolus immédiatement via `tool_handler`, et le flux de la soumission des
+    sorties d'outils est consommé à la suite, autant de tours que nécessaire
+    dans la limite de `max_tool_rounds`.
+    """
+
+    def __init__(self, client, thread_id, tool_handler, deadline, max_tool_rounds=DEFAULT_MAX_TOOL_ROUNDS,
+                 request=direct_request):
+        self.client = client
+        self.request = request
+        self.thread_id = thread_id
+        self.tool_handler = tool_handler
+        self.max_tool_rounds = max_tool_rounds
+        self.expires_at = time.monotonic() + deadline
+        self.deadline = deadline
+        self.final_run = None
+        self.run_id = None
+        self.tool_rounds = 0
+        self.events = []
+
+    def consume(self, stream):
+        for event in iter_with_deadline(stream, self.expires_at, f"Run toujours en cours après {self.deadline}s"):
+            self.events.append(event.event)
+            self.on_event(event)
+            if self.final_run is not None:
+                return self.final_run
+        return self.final_run
+
+    def on_event(self, event):
+        if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+            self.run_id = event.data.id
+        if event.event == "thread.run.requires_action":
+            self.on_requires_action(event.data)
+        elif event.event in TERMINAL_RUN_EVENTS:
+            self.final_run = event.data
+
+    def on_requires_action(self, run):
+        self.tool_rounds += 1
+        _check_tool_rounds(self.client, self.thread_id, run.id, self.tool_rounds, self.max_tool_rounds, self.request)
+        tool_outputs = self.tool_handler(run.required_action.submit_tool_outputs.tool_calls)
+        stream = self.request(
+            self.client.beta.threads.runs.submit_tool_outputs,
+            thread_id=self.thread_id, run_id=run.id, tool_outputs=tool_outputs, stream=True
+        )
+        self.consume(stream)
+
+
+def _stream_run(client, thread_id, assistant_id, tool_handler, deadline, max_tool_rounds, request):
+    handler = RunEventHandler(client, thread_id, tool_handler, deadline, max_tool_rounds, request)
+    try:
+        stream = request(client.beta.threads.runs.create, thread_id=thread_id, assistant_id=assistant_id, stream=True)
+    except TypeError as e:
+        raise StreamingUnavailableError(str(e)) from e
+    try:
+        run = handler.consume(stream)
+    except RunTimeoutError:
+        if handler.run_id is not None:
+            _cancel_run(client, thread_id, handler.run_id, request)
+        raise
+    if run is None:
+        raise RuntimeError("Flux du run terminé sans état final")
+    return run, handler.tool_rounds, handler.events
+
+
+def execute_run(client, thread_id, assistant_id, tool_handler=None, stream=True, deadline=DEFAULT_DEADLINE,
+                max_tool_rounds=DEFAULT_MAX_TOOL_ROUNDS, request=direct_request):
+    """
+    Exécute un run jusqu'à un état terminal et retourne un RunResult.
+    `tool_handler(tool_calls)` doit retourner la liste des `tool_outputs` à soumettre ;
+    il est appelé à chaque `requires_action`, au plus `max_tool_rounds` fois.
+    `request(fn, *args, **kwargs)` effectue chaque requête à l'API.
+    """
+    tool_handler = tool_handler or (lambda tool_calls: [])
+    start = time.perf_counter()
+    if stream:
+        try:
+            run, tool_rounds, events = _stream_run(
+                client, thread_id, assistant_id, tool_handler, deadline, max_tool_rounds, request
+            )
+            return record_run(RunResult(run, "stream", time.perf_counter() - start, tool_rounds, events))
+        except StreamingUnavailableError as e:
+            logger.warning("Streaming indisponible (%s), bascule sur le polling", e)
+            start = time.perf_counter()
+    run, tool_rounds = _poll_run(client, thread_id, assistant_id, tool_handler, deadline, max_tool_rounds, request)
+    return record_run(RunResult(run, "poll", time.perf_counter() - start, tool_rounds))
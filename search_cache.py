@@ -0,0 +1,125 @@
+"""
+Cache persistant des recherches Tavily.
+
+Les requêtes sont normalisées (casse, accents composés, espaces) avant d'être
+utilisées comme clé, les entrées expirent après `ttl` secondes et les moins
+récemment utilisées sont évincées au-delà de `max_entries`. Les requêtes
+identiques lancées en même temps (mode lot) sont fusionnées : un seul appel
+part, les autres threads attendent son résultat.
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+from db import DB_PATH, connect, transaction
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def normalize_query(query):
+    """Normalise une requête : NFKC, minuscules, espaces fusionnés."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(query.split())
+
+
+def search_cache_key(query, **params):
+    """Clé de cache : requête normalisée et paramètres de recherche."""
+    payload = normalize_query(query) + "|" + "|".join(f"{k}={params[k]}" for k in sorted(params))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """Cache SQLite (table `search_cache`) avec TTL, éviction LRU et fusion des requêtes en vol."""
+
+    def __init__(self, db_path=DB_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_latency = 0.0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.conn = connect(db_path, check_same_thread=False)
+
+    def _lookup(self, key, now):
+        row = self.conn.execute(
+            "SELECT result, latency, created_at FROM search_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[2] > self.ttl:
+            return None
+        self.conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def _store(self, key, query, result, latency):
+        now = time.time()
+        with self._lock, transaction(self.conn):
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, query, result, latency, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_query(query), result, latency, now, now)
+            )
+            self.conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,))
+            self.conn.execute("""
+                DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def get_or_fetch(self, query, fetch, **params):
+        """
+        Retourne le résultat en cache pour `query`, sinon appelle `fetch()`.
+        Si la même requête est déjà en cours dans un autre thread, attend son résultat.
+        """
+        key = search_cache_key(query, **params)
+        with self._lock:
+            cached = self._lookup(key, time.time())
+            if cached is not None:
+                self.hits += 1
+                self.saved_latency += cached[1]
+                return cached[0]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+
+        if not owner:
+            result, latency = future.result()
+            with self._lock:
+                self.saved_latency += latency
+            return result
+
+        try:
+            start = time.perf_counter()
+            result = fetch()
+            latency = time.perf_counter() - start
+            self._store(key, query, result, latency)
+            future.set_result((result, latency))
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        served = self.hits + self.coalesced
+        lookups = served + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": served / lookups if lookups else 0.0,
+            "saved_latency": self.saved_latency,
+            "entries": entries,
+        }
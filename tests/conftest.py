@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_clients import FakeMistral, FakeOpenAI, FakeTavily  # noqa: E402
+from migrations import migrate_database  # noqa: E402
+from pipeline import Clients  # noqa: E402
+
+ASSISTANT_KEYS = ("extraction", "extraction_structured", "product", "email")
+AGENT1_REPLY = {
+    "nom": "Dupont", "prenom": "Jean", "telephone": "06 11 22 33 44", "mail": "jean.dupont@acme.fr",
+    "entreprise": "ACME", "resume": "Directeur des opérations d'ACME.",
+}
+REPLIES = {
+    "extraction_structured": json.dumps(AGENT1_REPLY),
+    "product": "Matching : audit IA des entrepôts.",
+    "email": "Bonjour Jean, ... Cordialement Emeline Boulange Co-dirigeante de Nin-IA",
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Base `leads.db` temporaire, migrée."""
+    path = str(tmp_path / "leads.db")
+    migrate_database(path)
+    return path
+
+
+@pytest.fixture
+def make_clients(db_path):
+    """Fabrique de Clients sur des clients factices sans latence ; `ocr` : textes rendus par l'OCR."""
+    def make(ocr=("Jean Dupont\njean.dupont@acme.fr",), replies=None, backend="threads", **kwargs):
+        openai = FakeOpenAI(run_duration=0, replies=replies or REPLIES)
+        return Clients(
+            openai=openai, mistral=FakeMistral(list(ocr)), tavily=FakeTavily(default="contexte"),
+            assistant_ids={key: key for key in ASSISTANT_KEYS}, image_options=None, backend=backend,
+            leads_db=db_path, **kwargs,
+        )
+    return make
+
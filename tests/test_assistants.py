@@ -0,0 +1,28 @@
+"""Registre des assistants : création unique et nettoyage des orphelins."""
+from assistants import (ASSISTANT_MODEL, AssistantRegistry, assistant_prompt_instruction, email_assistant_instruction,
+                        product_assistant_instruction)
+from fake_clients import FakeOpenAI
+
+
+def test_ensure_all_creates_each_assistant_once(db_path):
+    client = FakeOpenAI()
+    first = AssistantRegistry(client, db_path).ensure_all()
+    second = AssistantRegistry(client, db_path).ensure_all()
+    assert first == second
+    assert client.calls["assistants.create"] == len(first)
+
+
+def test_cleanup_untagged_baseline_assistants_is_opt_in(db_path):
+    client = FakeOpenAI()
+    create = client.beta.assistants.create
+    # Assistants créés à chaque rerun par la version initiale : ni nom ni métadonnées.
+    baseline = [create(instructions=text, model=ASSISTANT_MODEL).id
+                for text in (assistant_prompt_instruction, product_assistant_instruction, email_assistant_instruction)]
+    unrelated = create(instructions="Assistant d'une autre application", model=ASSISTANT_MODEL).id
+    registry = AssistantRegistry(client, db_path)
+    current = set(registry.ensure_all().values())
+
+    assert registry.cleanup_orphans() == []
+    deleted = registry.cleanup_orphans(include_untagged=True)
+    assert sorted(deleted) == sorted(baseline)
+    assert set(client.beta.assistants.items) == current | {unrelated}
@@ -0,0 +1,56 @@
+"""Backend « chat » : statut selon la raison de fin, tours d'outils et échéance."""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from chat_backend import run_chat_agent
+from fake_clients import FakeOpenAI
+from pipeline import run_agent
+from runs import RunTimeoutError
+
+
+def chunk(content=None, finish_reason=None):
+    return SimpleNamespace(usage=None, choices=[
+        SimpleNamespace(finish_reason=finish_reason, delta=SimpleNamespace(content=content, tool_calls=None))
+    ])
+
+
+def echo_tools(tool_calls):
+    return [{"tool_call_id": call.id, "output": "contexte"} for call in tool_calls]
+
+
+def test_completed_with_tool_rounds():
+    client = FakeOpenAI(run_duration=0, tool_rounds=2, replies={"product": "Matching"})
+    response, run = run_chat_agent(client, "product", "Client", tool_handler=echo_tools)
+    assert (response, run.status, run.tool_rounds) == ("Matching", "completed", 2)
+
+
+@pytest.mark.parametrize("finish_reason", [None, "length", "content_filter", "inattendu"])
+def test_missing_or_unknown_finish_reason_is_incomplete(finish_reason):
+    """Un flux coupé avant le chunk de fin n'est pas une réponse complète."""
+    client = FakeOpenAI()
+    chunks = [chunk("Bonjour Jean, voici"), chunk(finish_reason=finish_reason)] if finish_reason else [chunk("Bonjour")]
+    client.chat.completions.create = lambda **kwargs: iter(chunks)
+    _, run = run_chat_agent(client, "email", "Mail")
+    assert run.status == "incomplete"
+
+
+def test_truncated_answer_fails_the_stage(make_clients):
+    clients = make_clients(backend="chat")
+    clients.openai.chat.completions.create = lambda **kwargs: iter([chunk("Bonjour Jean, voici")])
+    with pytest.raises(RuntimeError, match="incomplete"):
+        run_agent(clients, "email", "Mail")
+
+
+def test_silent_stream_stops_at_deadline():
+    def silent_stream():
+        yield chunk("Bonjour")
+        time.sleep(5)
+
+    client = FakeOpenAI()
+    client.chat.completions.create = lambda **kwargs: silent_stream()
+    start = time.monotonic()
+    with pytest.raises(RunTimeoutError):
+        run_chat_agent(client, "email", "Mail", deadline=0.2)
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,49 @@
+"""Connexions par thread : recyclées d'un thread de script au suivant, jamais partagées entre threads vivants."""
+import threading
+
+from db import get_connection
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_connection_is_reused_by_the_next_thread(db_path):
+    first = in_thread(lambda: get_connection(db_path))
+    second = in_thread(lambda: get_connection(db_path))
+    assert second is first
+    assert second.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_live_threads_keep_their_own_connection(db_path):
+    ready, release = threading.Barrier(2), threading.Event()
+    connections = []
+
+    def worker():
+        conn = get_connection(db_path)
+        connections.append(conn)
+        ready.wait()
+        release.wait()
+        assert get_connection(db_path) is conn
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    ready.wait()
+    other = in_thread(lambda: get_connection(db_path))
+    release.set()
+    thread.join()
+    assert other is not connections[0]
+
+
+def test_open_transaction_is_rolled_back_on_release(db_path):
+    def leave_transaction_open():
+        conn = get_connection(db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    conn = in_thread(leave_transaction_open)
+    assert not conn.in_transaction
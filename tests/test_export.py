@@ -0,0 +1,40 @@
+"""Export vCard : échappement des valeurs et repli des lignes longues (RFC 6350)."""
+from export import _vcard_escape, _vcard_fold
+
+
+def unfold(text):
+    return text.replace("\r\n ", "")
+
+
+def test_escape_special_characters():
+    assert _vcard_escape("a\\b") == "a\\\\b"
+    assert _vcard_escape("Dupont, Durand; associés") == "Dupont\\, Durand\\; associés"
+    assert _vcard_escape("ligne 1\r\nligne 2\nligne 3") == "ligne 1\\nligne 2\\nligne 3"
+    assert _vcard_escape(None) == ""
+
+
+def test_short_line_is_not_folded():
+    line = "N:" + "x" * 73
+    assert _vcard_fold(line) == line + "\r\n"
+
+
+def test_long_line_is_folded_at_75_octets():
+    line = "NOTE:" + "x" * 200
+    folded = _vcard_fold(line)
+    assert folded.endswith("\r\n")
+    physical = folded[:-2].split("\r\n")
+    assert len(physical[0].encode("utf-8")) == 75
+    assert all(part.startswith(" ") for part in physical[1:])
+    assert all(len(part.encode("utf-8")) <= 75 for part in physical)
+    assert all(len(part.encode("utf-8")) == 75 for part in physical[1:-1])
+    assert unfold(folded[:-2]) == line
+
+
+def test_fold_never_splits_a_multibyte_character():
+    line = "NOTE:" + "é€😀" * 40
+    folded = _vcard_fold(line)
+    physical = folded[:-2].split("\r\n")
+    # Un caractère qui ne tient plus entier passe à la ligne suivante, quitte à finir sous 75 octets.
+    assert all(len(part.encode("utf-8")) <= 75 for part in physical)
+    assert any(len(part.encode("utf-8")) < 75 for part in physical[:-1])
+    assert unfold(folded[:-2]) == line
@@ -0,0 +1,57 @@
+"""Limites et retries de ProviderGate appliqués requête par requête, pas à l'assistant entier."""
+import pytest
+
+from batch import ProviderGate
+from pipeline import run_agent
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def fail_first_calls(obj, name, failures=1):
+    """Fait échouer en 429 les `failures` premiers appels de `obj.name`."""
+    original = getattr(obj, name)
+    state = {"left": failures}
+
+    def wrapper(*args, **kwargs):
+        if state["left"]:
+            state["left"] -= 1
+            raise RateLimited("429 Too Many Requests")
+        return original(*args, **kwargs)
+    setattr(obj, name, wrapper)
+
+
+@pytest.fixture
+def gate():
+    return ProviderGate(max_attempts=3, base_delay=0, max_delay=0)
+
+
+def test_threads_429_retries_the_request_only(make_clients, gate):
+    clients = make_clients(gate=gate)
+    clients.openai.tool_rounds = 1
+    fail_first_calls(clients.openai.beta.threads.runs, "submit_tool_outputs")
+    response, run = run_agent(clients, "product", "Matching")
+    assert response == "Matching : audit IA des entrepôts."
+    assert run.status == "completed" and run.tool_rounds == 1
+    assert clients.openai.calls["threads.create"] == 1
+    assert clients.openai.calls["runs.create"] == 1
+
+
+def test_chat_429_retries_the_request_only(make_clients, gate):
+    clients = make_clients(gate=gate, backend="chat")
+    clients.openai.tool_rounds = 1
+    fail_first_calls(clients.openai.chat.completions, "create", failures=2)
+    response, run = run_agent(clients, "product", "Matching")
+    assert response == "Matching : audit IA des entrepôts."
+    assert clients.openai.calls["chat.completions.create"] == 2
+
+
+def test_tavily_429_does_not_restart_the_agent(make_clients, gate):
+    clients = make_clients(gate=gate)
+    clients.openai.tool_rounds = 1
+    fail_first_calls(clients.tavily, "get_search_context", failures=10)
+    run_agent(clients, "product", "Matching")
+    assert clients.tavily.calls["get_search_context"] == 0
+    assert clients.openai.calls["threads.create"] == 1
+    assert clients.openai.calls["runs.create"] == 1
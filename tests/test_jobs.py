@@ -0,0 +1,95 @@
+"""File de jobs : reprise après échec, remise en file au démarrage, relance d'un job sans nouvelle."""
+import time
+
+import pytest
+
+from db import connect, get_connection
+from jobs import (JobLostError, JobWorkerPool, claim_job, complete_job, count_jobs, fetch_jobs, retry_job,
+                  save_checkpoint, submit_job)
+
+
+def job_status(conn, job_id):
+    return {job["id"]: job for job in fetch_jobs(conn)}[job_id]
+
+
+def test_failed_job_resumes_after_last_checkpoint(make_clients, db_path):
+    conn = get_connection(db_path)
+    job_id = submit_job(conn, b"carte", "Smart Talk", "Salon")
+    broken = make_clients()
+    del broken.assistant_ids["product"]
+    JobWorkerPool(broken, db_path).run_job(conn, claim_job(conn))
+    job = job_status(conn, job_id)
+    assert (job["status"], job["stage"]) == ("failed", "agent1")
+
+    retry_job(conn, job_id)
+    clients = make_clients()
+    JobWorkerPool(clients, db_path).run_job(conn, claim_job(conn))
+    job = job_status(conn, job_id)
+    assert (job["status"], job["stage"], job["attempts"]) == ("done", "agent3", 2)
+    assert job["lead_id"] is not None
+    assert clients.mistral.calls["ocr.process"] == 0
+    assert clients.openai.calls["runs.create"] == 2
+
+
+def test_pool_start_requeues_every_running_job(make_clients, db_path):
+    """Un job laissé « running » par un processus arrêté à l'instant est repris au démarrage suivant."""
+    conn = get_connection(db_path)
+    job_id = submit_job(conn, b"carte", "Smart Talk", "Salon")
+    claim_job(conn)
+    assert job_status(conn, job_id)["status"] == "running"
+
+    JobWorkerPool(make_clients(), db_path, workers=0).start()
+    assert job_status(conn, job_id)["status"] == "pending"
+
+
+def test_retry_only_stale_running_jobs(db_path):
+    conn = get_connection(db_path)
+    job_id = submit_job(conn, b"carte", "Smart Talk", "Salon")
+    claim_job(conn)
+    retry_job(conn, job_id)
+    assert job_status(conn, job_id)["status"] == "running"
+
+    conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 3600, job_id))
+    conn.commit()
+    retry_job(conn, job_id)
+    assert job_status(conn, job_id)["status"] == "pending"
+
+
+def test_requeued_job_cannot_be_written_by_previous_worker(make_clients, db_path):
+    conn = get_connection(db_path)
+    job_id = submit_job(conn, b"carte", "Smart Talk", "Salon")
+    stale = claim_job(conn)
+    JobWorkerPool(make_clients(), db_path, workers=0).start()
+    current = claim_job(conn)
+    assert current["attempt"] == stale["attempt"] + 1
+
+    lead = {"ocr_text": "Jean Dupont"}
+    with pytest.raises(JobLostError):
+        save_checkpoint(conn, job_id, stale["attempt"], "ocr", lead)
+    with pytest.raises(JobLostError):
+        complete_job(conn, job_id, stale["attempt"], lead)
+    assert connect(db_path).execute("SELECT COUNT(*) FROM leads").fetchone()[0] == 0
+    assert job_status(conn, job_id)["status"] == "running"
+
+
+def test_reuse_is_off_unless_requested(db_path):
+    conn = get_connection(db_path)
+    conn.execute("INSERT INTO jobs (image, created_at, updated_at) VALUES (?, ?, ?)", (b"carte", 0, 0))
+    conn.commit()
+    assert claim_job(conn)["reuse_enrichment"] is False
+
+
+def test_counts_and_retryable_pages(db_path):
+    conn = get_connection(db_path)
+    ids = [submit_job(conn, b"carte", "Smart Talk", "Salon", owner="session") for _ in range(25)]
+    submit_job(conn, b"carte", "Smart Talk", "Salon", owner="autre")
+    conn.execute(f"UPDATE jobs SET status = 'failed' WHERE id IN ({', '.join(map(str, ids[:22]))})")
+    conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time() - 3600, ids[22]))
+    conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), ids[23]))
+    conn.commit()
+
+    assert count_jobs(conn, owner="session") == {"failed": 22, "running": 2, "pending": 1}
+    assert sum(count_jobs(conn, owner="session", retryable=True).values()) == 23
+    pages = [fetch_jobs(conn, owner="session", retryable=True, limit=20, offset=offset) for offset in (0, 20)]
+    assert sorted(job["id"] for page in pages for job in page) == sorted(ids[:23])
+    assert [job["id"] for job in fetch_jobs(conn, owner="session", statuses=("pending",))] == [ids[24]]
@@ -0,0 +1,51 @@
+"""Liste des leads : pagination par clé (timestamp, id) et requêtes FTS5."""
+from db import connect, insert_leads
+from leads_repository import fetch_leads_page, fts_query, search_leads
+
+
+def store_leads(conn, timestamps):
+    ids = insert_leads(conn, [{
+        "ocr_text": "", "nom": f"Nom{i}", "prenom": "Sophie", "telephone": "", "mail": f"sophie{i}@acme.fr",
+        "agent1": "", "agent2": "", "agent3": "", "qualification": "Smart Talk", "note": "Salon",
+    } for i in range(len(timestamps))])
+    conn.executemany("UPDATE leads SET timestamp = ? WHERE id = ?", zip(timestamps, ids))
+    return ids
+
+
+def test_pages_split_inside_equal_timestamps(db_path):
+    conn = connect(db_path)
+    # Plusieurs leads par seconde (mode lot) : les frontières de page tombent au milieu d'un même timestamp.
+    ids = store_leads(conn, ["2024-05-02 10:00:00"] * 5 + ["2024-05-01 09:00:00"] * 4)
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch_leads_page(conn, after=cursor, page_size=3)
+        seen += [row["id"] for row in rows]
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == sorted(ids[:5], reverse=True) + sorted(ids[5:], reverse=True)
+
+
+def test_last_full_page_has_no_next_cursor(db_path):
+    conn = connect(db_path)
+    store_leads(conn, ["2024-05-02 10:00:00"] * 4)
+    rows, cursor = fetch_leads_page(conn, page_size=2)
+    rows, cursor = fetch_leads_page(conn, after=cursor, page_size=2)
+    assert len(rows) == 2
+    assert cursor is None
+
+
+def test_fts_query_quotes_each_term():
+    assert fts_query("jean.dupont@acme.fr") == '"jean.dupont@acme.fr"*'
+    assert fts_query("Jean-Pierre  NOT acme") == '"Jean-Pierre" "NOT" "acme"*'
+    assert fts_query('dupont "acme') == '"dupont" "acme"*'
+    assert fts_query("  -*()  ") is None
+
+
+def test_search_accepts_special_characters(db_path):
+    conn = connect(db_path)
+    ids = store_leads(conn, ["2024-05-02 10:00:00"] * 2)
+    assert [row["id"] for row in search_leads(conn, "sophie1@acme.fr")] == [ids[1]]
+    assert [row["id"] for row in search_leads(conn, "Nom0 AND")] == []
+    assert search_leads(conn, '"(') == []
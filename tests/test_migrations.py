@@ -0,0 +1,54 @@
+"""Migrations du schéma, y compris depuis une base créée par la version initiale."""
+import sqlite3
+
+from db import connect, insert_lead
+from leads_repository import find_lead_by_contact, search_leads
+from migrations import MIGRATIONS, migrate, schema_version
+
+# Table telle que la laissait la version initiale : colonnes ajoutées une à une,
+# sans `timestamp` (ALTER TABLE refusait son DEFAULT CURRENT_TIMESTAMP).
+LEGACY_COLUMNS = ("ocr_text", "nom", "prenom", "telephone", "mail", "agent1", "agent2", "agent3",
+                  "qualification", "note")
+
+
+def legacy_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE leads (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+    for column in LEGACY_COLUMNS:
+        conn.execute(f"ALTER TABLE leads ADD COLUMN {column} TEXT")
+    conn.execute(
+        f"INSERT INTO leads ({', '.join(LEGACY_COLUMNS)}) VALUES ({', '.join('?' for _ in LEGACY_COLUMNS)})",
+        ("Jean Dupont ACME", "Dupont", "Jean", "06 11 22 33 44", "Jean.Dupont@ACME.fr", "Agent 1", "Agent 2",
+         "Agent 3", "Smart Talk", "Rencontré au salon"),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_reaches_latest_version(tmp_path):
+    conn = connect(str(tmp_path / "leads.db"))
+    assert migrate(conn) == len(MIGRATIONS)
+    assert migrate(conn) == len(MIGRATIONS)
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = str(tmp_path / "leads.db")
+    legacy_database(path)
+    conn = connect(path)
+    assert schema_version(conn) == 0
+    assert migrate(conn) == len(MIGRATIONS)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(leads)")}
+    assert {"timestamp", "mail_normalized", "telephone_normalized", "reused_from"} <= columns
+    row = conn.execute("SELECT id, nom, mail_normalized, telephone_normalized FROM leads").fetchone()
+    assert row == (1, "Dupont", "jean.dupont@acme.fr", "+33611223344")
+    assert find_lead_by_contact(conn, mails=["jean.dupont@acme.fr"])["id"] == 1
+    assert [lead["id"] for lead in search_leads(conn, "salon")] == [1]
+
+    new_id = insert_lead(conn, {
+        "ocr_text": "", "nom": "Martin", "prenom": "Paul", "telephone": "", "mail": "", "agent1": "",
+        "agent2": "", "agent3": "", "qualification": "Smart Talk", "note": "Nouveau salon",
+    })
+    assert new_id == 2
+    assert conn.execute("SELECT timestamp FROM leads WHERE id = 2").fetchone()[0] is not None
+    assert sorted(lead["id"] for lead in search_leads(conn, "salon")) == [1, 2]
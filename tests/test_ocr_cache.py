@@ -0,0 +1,30 @@
+"""Cache OCR : la clé dépend de l'image, du modèle et des options de prétraitement."""
+from dataclasses import replace
+
+from image_preprocessing import ImageOptions
+from ocr_cache import OCRCache, ocr_cache_key
+from pipeline import OCR_MODEL, run_ocr
+
+
+def test_key_depends_on_preprocessing_options():
+    options = ImageOptions()
+    key = ocr_cache_key(b"carte", OCR_MODEL, options)
+    assert key == ocr_cache_key(b"carte", OCR_MODEL, ImageOptions())
+    assert key != ocr_cache_key(b"carte", OCR_MODEL, replace(options, max_dimension=800))
+    assert key != ocr_cache_key(b"carte", OCR_MODEL, replace(options, crop=False))
+    assert key != ocr_cache_key(b"carte", OCR_MODEL, None)
+    assert key != ocr_cache_key(b"autre carte", OCR_MODEL, options)
+
+
+def test_changed_options_miss_the_cache(db_path):
+    cache = OCRCache(db_path)
+    cache.put(b"carte", OCR_MODEL, "Jean Dupont", ImageOptions())
+    assert cache.get(b"carte", OCR_MODEL, ImageOptions()) == "Jean Dupont"
+    assert cache.get(b"carte", OCR_MODEL, ImageOptions(max_dimension=800)) is None
+    assert cache.get(b"carte", OCR_MODEL, None) is None
+
+
+def test_run_ocr_uses_the_cache(make_clients, db_path):
+    clients = make_clients(ocr_cache=OCRCache(db_path))
+    assert run_ocr(clients, b"carte") == run_ocr(clients, b"carte")
+    assert clients.mistral.calls["ocr.process"] == 1
@@ -0,0 +1,104 @@
+"""Pipeline complet sur clients factices : étapes, reprise d'un checkpoint, réutilisation d'un contact connu."""
+import json
+
+from conftest import AGENT1_REPLY, REPLIES
+from contacts import is_role_mailbox
+from db import connect, insert_lead
+from pipeline import process_card
+
+CARD = "Jean Dupont\nACME\ncontact@acme.fr\njean.dupont@acme.fr\n01 23 45 67 89"
+
+
+def store_lead(db_path, **fields):
+    lead = {
+        "ocr_text": "", "nom": "Durand", "prenom": "Sophie", "telephone": "01 23 45 67 89",
+        "mail": "contact@acme.fr", "agent1": "Nom: Durand", "agent2": "Matching de Sophie",
+        "agent3": "Bonjour Sophie", "qualification": "Smart Talk", "note": "Salon",
+    }
+    lead.update(fields)
+    return insert_lead(connect(db_path), lead)
+
+
+def test_process_card_runs_every_stage(make_clients):
+    clients = make_clients()
+    stages = []
+    lead = process_card(clients, b"carte", "Smart Talk", "Salon", on_stage=lambda stage, lead: stages.append(stage))
+    assert stages == ["ocr", "agent1", "agent2", "agent3"]
+    assert (lead["nom"], lead["mail"]) == ("Dupont", "jean.dupont@acme.fr")
+    assert set(lead["runs"]) == {"agent1", "agent2", "agent3"}
+    assert "reused_from" not in lead
+
+
+def test_checkpoint_skips_done_stages(make_clients):
+    clients = make_clients()
+    first = process_card(clients, b"carte", "Smart Talk", "Salon")
+    checkpoint = {key: first[key] for key in ("ocr_text", "agent1", "nom", "prenom", "telephone", "mail",
+                                             "entreprise", "resume")}
+    clients = make_clients()
+    lead = process_card(clients, b"carte", "Smart Talk", "Salon", checkpoint=checkpoint)
+    assert clients.mistral.calls["ocr.process"] == 0
+    assert set(lead["runs"]) == {"agent2", "agent3"}
+
+
+def test_role_mailbox_detection():
+    assert is_role_mailbox("contact@acme.fr")
+    assert is_role_mailbox("info2@acme.fr")
+    assert is_role_mailbox("sales-fr@acme.fr")
+    assert not is_role_mailbox("jean.dupont@acme.fr")
+
+
+def test_reuse_is_off_by_default(make_clients, db_path):
+    store_lead(db_path, nom="Dupont", prenom="Jean", mail="jean.dupont@acme.fr")
+    lead = process_card(make_clients(ocr=[CARD]), b"carte", "Smart Talk", "Salon")
+    assert "reused_from" not in lead
+    assert set(lead["runs"]) == {"agent1", "agent2", "agent3"}
+
+
+def test_shared_mailbox_does_not_reuse_identity(make_clients, db_path):
+    """Une carte qui porte contact@ ne reprend pas l'identité d'un collègue enregistré avec ce mail."""
+    store_lead(db_path)
+    lead = process_card(make_clients(ocr=[CARD], reuse_enrichment=True), b"carte", "Smart Talk", "Salon")
+    assert "agent1" in lead["runs"]
+    assert (lead["nom"], lead["prenom"]) == ("Dupont", "Jean")
+
+
+def test_personal_mail_reuses_enrichment(make_clients, db_path):
+    lead_id = store_lead(db_path, nom="Dupont", prenom="Jean", mail="jean.dupont@acme.fr",
+                         agent2="Matching de Jean")
+    lead = process_card(make_clients(ocr=[CARD], reuse_enrichment=True), b"carte", "Smart Talk", "Salon")
+    assert lead["reused_from"] == lead_id
+    assert set(lead["runs"]) == {"agent3"}
+    assert (lead["nom"], lead["agent2"]) == ("Dupont", "Matching de Jean")
+
+
+def test_several_personal_mails_skip_early_reuse(make_clients, db_path):
+    """Deux personnes sur la carte : pas de reprise avant l'assistant 1, qui identifie le contact."""
+    store_lead(db_path, nom="Martin", prenom="Paul", mail="paul.martin@acme.fr", telephone="")
+    card = CARD + "\npaul.martin@acme.fr"
+    lead = process_card(make_clients(ocr=[card], reuse_enrichment=True), b"carte", "Smart Talk", "Salon")
+    assert "agent1" in lead["runs"]
+    assert lead["nom"] == "Dupont"
+
+
+def test_shared_contacts_extracted_by_agent1_do_not_reuse(make_clients, db_path):
+    """Après l'assistant 1, ni contact@ ni le standard ne reprennent le matching d'un collègue."""
+    store_lead(db_path)
+    card = "Jean Dupont\nACME\ncontact@acme.fr\n01 23 45 67 89"
+    replies = {**REPLIES, "extraction_structured": json.dumps(
+        {**AGENT1_REPLY, "mail": "contact@acme.fr", "telephone": "01 23 45 67 89"}
+    )}
+    lead = process_card(make_clients(ocr=[card], replies=replies, reuse_enrichment=True),
+                        b"carte", "Smart Talk", "Salon")
+    assert "reused_from" not in lead
+    assert set(lead["runs"]) == {"agent1", "agent2", "agent3"}
+    assert lead["agent2"] == REPLIES["product"]
+
+
+def test_personal_mail_from_agent1_reuses_matching(make_clients, db_path):
+    lead_id = store_lead(db_path, nom="Dupont", prenom="Jean", mail="jean.dupont@acme.fr", telephone="",
+                         agent2="Matching de Jean")
+    card = "Jean Dupont\nACME\n06 11 22 33 44"
+    lead = process_card(make_clients(ocr=[card], reuse_enrichment=True), b"carte", "Smart Talk", "Salon")
+    assert lead["reused_from"] == lead_id
+    assert set(lead["runs"]) == {"agent1", "agent3"}
+    assert lead["agent2"] == "Matching de Jean"
@@ -0,0 +1,105 @@
+"""Runs d'assistants en streaming et en polling sur FakeOpenAI."""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from fake_clients import FakeOpenAI
+from pipeline import get_final_assistant_message, run_agent
+from runs import RunEventHandler, RunTimeoutError, ToolRoundsExceededError, execute_run
+
+REPLY = "Nom: Martin\nPrénom: Claire\nMail: claire.martin@acme.fr"
+
+
+def start_thread(client):
+    thread = client.beta.threads.create()
+    client.beta.threads.messages.create(thread_id=thread.id, role="user", content="Carte")
+    return thread
+
+
+def echo_tools(tool_calls):
+    return [{"tool_call_id": call.id, "output": "contexte"} for call in tool_calls]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+@pytest.mark.parametrize("tool_rounds", [0, 1, 3])
+def test_run_returns_final_run_and_reply(stream, tool_rounds):
+    client = FakeOpenAI(run_duration=0, tool_rounds=tool_rounds, reply=REPLY)
+    thread = start_thread(client)
+    result = execute_run(client, thread.id, "asst_1", tool_handler=echo_tools, stream=stream)
+    assert result.mode == ("stream" if stream else "poll")
+    assert result.status == "completed"
+    assert result.run.id.startswith("run_")
+    assert result.tool_rounds == tool_rounds
+    assert result.usage["completion_tokens"] == len(REPLY) // 4
+    assert get_final_assistant_message(client, thread.id) == REPLY
+
+
+def test_step_completed_does_not_end_stream():
+    """`thread.run.step.completed` (étape d'outils) précède la réponse : le run n'est pas terminé."""
+    client = FakeOpenAI(run_duration=0, tool_rounds=1, reply=REPLY)
+    thread = start_thread(client)
+    handler = RunEventHandler(client, thread.id, echo_tools, deadline=5)
+    run = handler.consume(client.beta.threads.runs.create(thread_id=thread.id, assistant_id="asst_1", stream=True))
+    assert "thread.run.step.completed" in handler.events
+    assert handler.events[-1] == "thread.run.completed"
+    assert run.id.startswith("run_") and run.status == "completed"
+
+
+def test_stream_falls_back_to_polling():
+    client = FakeOpenAI(run_duration=0, tool_rounds=1, reply=REPLY, supports_stream=False)
+    thread = start_thread(client)
+    result = execute_run(client, thread.id, "asst_1", tool_handler=echo_tools)
+    assert result.mode == "poll"
+    assert get_final_assistant_message(client, thread.id) == REPLY
+
+
+def test_tool_rounds_limit_cancels_run():
+    client = FakeOpenAI(run_duration=0, tool_rounds=3)
+    thread = start_thread(client)
+    with pytest.raises(ToolRoundsExceededError):
+        execute_run(client, thread.id, "asst_1", tool_handler=echo_tools, max_tool_rounds=2)
+    assert client.calls["runs.cancel"] == 1
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_deadline_cancels_the_run(stream):
+    client = FakeOpenAI(run_duration=1.0, reply=REPLY)
+    thread = start_thread(client)
+    start = time.monotonic()
+    with pytest.raises(RunTimeoutError):
+        execute_run(client, thread.id, "asst_1", stream=stream, deadline=0.2)
+    assert time.monotonic() - start < 0.6
+    assert client.calls["runs.cancel"] == 1
+    assert all(state["run"].status == "cancelled" for state in client._runs.values())
+
+
+def test_deadline_covers_every_tool_round():
+    """L'échéance borne le run entier, pas chaque attente."""
+    client = FakeOpenAI(run_duration=0.15, tool_rounds=5)
+    thread = start_thread(client)
+    with pytest.raises(RunTimeoutError):
+        execute_run(client, thread.id, "asst_1", tool_handler=echo_tools, stream=False, deadline=0.4)
+    assert client.calls["runs.cancel"] == 1
+
+
+def test_silent_stream_stops_at_deadline():
+    def silent_stream():
+        yield SimpleNamespace(event="thread.run.created", data=SimpleNamespace(id="run_1", status="queued"))
+        time.sleep(5)
+
+    client = FakeOpenAI()
+    client.beta.threads.runs.create = lambda **kwargs: silent_stream()
+    client._runs["run_1"] = {"run": SimpleNamespace(id="run_1", status="in_progress")}
+    start = time.monotonic()
+    with pytest.raises(RunTimeoutError):
+        execute_run(client, "thread_1", "asst_1", deadline=0.2)
+    assert time.monotonic() - start < 1.0
+    assert client.calls["runs.cancel"] == 1
+
+
+def test_pipeline_passes_run_deadline(make_clients):
+    clients = make_clients(run_deadline=0.1)
+    clients.openai.run_duration = 1.0
+    with pytest.raises(RunTimeoutError):
+        run_agent(clients, "product", "Matching")
@@ -0,0 +1,73 @@
+"""Cache Tavily : les requêtes identiques en vol sont fusionnées, erreurs comprises."""
+import threading
+import time
+
+import pytest
+
+from search_cache import SearchCache
+
+THREADS = 5
+
+
+def run_concurrently(cache, fetch, started):
+    """Lance THREADS fois la même requête ; `fetch` ne se termine qu'une fois tous les threads en attente."""
+    results = [None] * THREADS
+
+    def lookup(index):
+        try:
+            results[index] = cache.get_or_fetch("Jean  Dupont ACME", fetch, max_results=3)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=lookup, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    return threads, results
+
+
+def wait_for_waiters(cache):
+    while True:
+        with cache._lock:
+            if cache.coalesced == THREADS - 1:
+                return
+        time.sleep(0.001)
+
+
+def test_identical_queries_in_flight_are_coalesced(db_path):
+    cache = SearchCache(db_path)
+    started, calls = threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        wait_for_waiters(cache)
+        return "résultat"
+
+    threads, results = run_concurrently(cache, fetch, started)
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == ["résultat"] * THREADS
+    assert (cache.misses, cache.coalesced) == (1, THREADS - 1)
+    assert cache.get_or_fetch("jean dupont acme", pytest.fail, max_results=3) == "résultat"
+    assert cache.hits == 1
+
+
+def test_fetch_error_reaches_every_waiting_thread(db_path):
+    cache = SearchCache(db_path)
+    started, calls = threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        wait_for_waiters(cache)
+        raise RuntimeError("Tavily indisponible")
+
+    threads, results = run_concurrently(cache, fetch, started)
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "Tavily indisponible" for r in results)
+    # L'échec n'est pas mis en cache : la requête suivante rappelle Tavily.
+    assert cache.get_or_fetch("Jean Dupont ACME", lambda: "réessai", max_results=3) == "réessai"
@@ -0,0 +1,63 @@
+"""ToolRegistry : appels parallèles, durée propre à chaque appel, délai commun du tour."""
+import json
+import time
+from types import SimpleNamespace
+
+from tools import ToolRegistry
+
+
+def tool_call(call_id, name, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+def make_registry(timeout=5.0):
+    registry = ToolRegistry(timeout=timeout)
+
+    @registry.register("sleep")
+    def sleep(seconds):
+        time.sleep(seconds)
+        return f"{seconds}s"
+
+    @registry.register("fail")
+    def fail():
+        raise ValueError("quota dépassé")
+
+    return registry
+
+
+def test_outputs_keep_call_order():
+    timings = []
+    outputs = make_registry().run_tool_calls(
+        [tool_call("a", "sleep", seconds=0.05), tool_call("b", "sleep", seconds=0.0)], timings
+    )
+    assert [o["tool_call_id"] for o in outputs] == ["a", "b"]
+    assert [o["output"] for o in outputs] == ["0.05s", "0.0s"]
+    assert all(timing.ok for timing in timings)
+
+
+def test_failure_reports_its_own_duration():
+    """Un appel qui échoue aussitôt ne se voit pas attribuer la durée d'un voisin lent."""
+    timings = []
+    outputs = make_registry().run_tool_calls([tool_call("a", "sleep", seconds=0.3), tool_call("b", "fail")], timings)
+    assert "quota dépassé" in outputs[1]["output"]
+    slow, failed = timings
+    assert slow.ok and slow.duration >= 0.3
+    assert not failed.ok and failed.duration < 0.1
+
+
+def test_unknown_tool_is_an_error_output():
+    timings = []
+    outputs = make_registry().run_tool_calls([tool_call("a", "absent")], timings)
+    assert "Outil inconnu" in outputs[0]["output"]
+    assert not timings[0].ok
+
+
+def test_timeout_is_shared_by_the_round():
+    timings = []
+    start = time.perf_counter()
+    outputs = make_registry(timeout=0.2).run_tool_calls(
+        [tool_call("a", "sleep", seconds=1.0), tool_call("b", "sleep", seconds=1.0)], timings
+    )
+    assert time.perf_counter() - start < 0.6
+    assert all("n'a pas répondu" in o["output"] for o in outputs)
+    assert all(not timing.ok and timing.duration < 0.6 for timing in timings)
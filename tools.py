@@ -0,0 +1,95 @@
+"""
+Registre des outils appelables par les assistants.
+
+Tous les appels d'outils d'un même `requires_action` sont exécutés en
+parallèle, dans un délai commun (`timeout`, compté depuis le début du tour) ;
+un appel en échec ou trop long renvoie un message d'erreur à l'assistant
+plutôt que de bloquer le run. La durée de chaque appel est mesurée depuis son
+propre démarrage.
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_TIMEOUT = 60.0
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class ToolTiming:
+    """Durée d'un appel d'outil."""
+    name: str
+    duration: float
+    ok: bool
+
+
+class ToolRegistry:
+    """Associe un nom d'outil à une fonction Python recevant les arguments JSON de l'appel."""
+
+    def __init__(self, timeout=DEFAULT_TOOL_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._tools = {}
+
+    def register(self, name, fn=None):
+        """Enregistre `fn` sous `name` ; utilisable comme décorateur."""
+        if fn is None:
+            return lambda f: self.register(name, f)
+        self._tools[name] = fn
+        return fn
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def _call(self, tool_call, started):
+        """Exécute un appel ; retourne (sortie, durée, exception) et note son démarrage dans `started`."""
+        start = started[tool_call.id] = time.perf_counter()
+        try:
+            fn = self._tools.get(tool_call.function.name)
+            if fn is None:
+                raise KeyError(f"Outil inconnu : {tool_call.function.name}")
+            output = fn(**json.loads(tool_call.function.arguments or "{}"))
+            return output, time.perf_counter() - start, None
+        except Exception as e:
+            return None, time.perf_counter() - start, e
+
+    def run_tool_calls(self, tool_calls, timings=None):
+        """
+        Exécute les appels en parallèle et retourne les `tool_outputs` dans l'ordre.
+        Un appel qui n'a pas répondu `timeout` secondes après le début du tour est
+        abandonné. Les durées sont ajoutées à `timings` (liste de ToolTiming) si fournie.
+        """
+        if not tool_calls:
+            return []
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(tool_calls)))
+        deadline = time.perf_counter() + self.timeout
+        started = {}
+        futures = [executor.submit(self._call, tool_call, started) for tool_call in tool_calls]
+        tool_outputs = []
+        for tool_call, future in zip(tool_calls, futures):
+            name = tool_call.function.name
+            try:
+                output, duration, error = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                ok = error is None
+                if error is not None:
+                    output = f"Erreur lors de l'appel à {name} : {error}"
+            except FutureTimeoutError:
+                call_start = started.get(tool_call.id)
+                duration = time.perf_counter() - call_start if call_start is not None else 0.0
+                output, ok = f"Erreur : l'outil {name} n'a pas répondu en {self.timeout:.0f}s.", False
+            if not ok:
+                logger.warning("Appel d'outil %s en échec : %s", name, output)
+            if timings is not None:
+                timings.append(ToolTiming(name, duration, ok))
+            tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
+        # Les appels hors délai continuent en arrière-plan, sans bloquer le run.
+        executor.shutdown(wait=False, cancel_futures=True)
+        return tool_outputs
+
+    def handler(self, timings=None):
+        """Retourne un `tool_handler` pour runs.execute_run."""
+        return lambda tool_calls: self.run_tool_calls(tool_calls, timings)